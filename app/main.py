@@ -14,7 +14,11 @@ if not settings.BOT_TOKEN:
     sys.exit(1)
 
 # Импортируем бота
-from bot.bot_instance import bot
+from bot.bot_instance import bot, session_checkpointer
+from sql_db.attempt_journal import attempt_journal
+from sql_db.db_init import engine
+from sql_db.maintenance import start_maintenance
+from sql_db.migrations import upgrade_schema
 
 # Импортируем все handlers для регистрации
 from bot.handlers import start
@@ -30,9 +34,16 @@ def main():
     print('Бот для изучения английских слов')
     print('=' * 50)
     print(f'Токен: {settings.BOT_TOKEN[:10]}...')
+    print(f'Обработчиков: {settings.BOT_WORKERS}, очередь до {settings.BOT_MAX_PENDING} задач')
     print('Запуск бота...')
 
     try:
+        # Догоняем схему БД до текущих моделей (новые таблицы, колонки, индексы)
+        upgrade_schema(engine)
+
+        # Фоновые задачи обслуживания БД (глобальный сброс прогресса и т.п.)
+        start_maintenance()
+
         # Удаляем вебхук, если был установлен
         bot.remove_webhook()
 
@@ -43,6 +54,18 @@ def main():
     except Exception as e:
         print(f'Ошибка: {e}')
         raise
+    finally:
+        # Дописываем в БД попытки, ожидающие отложенной записи
+        try:
+            attempt_journal.close()
+        except Exception as e:
+            print(f'Попытки из буфера не записаны: {e}')
+
+        # Сохраняем сессии обучения — после перезапуска пользователи продолжат квиз
+        try:
+            session_checkpointer.close()
+        except Exception as e:
+            print(f'Сессии обучения не сохранены: {e}')
 
 
 if __name__ == '__main__':
@@ -1,14 +1,44 @@
 # Создание экземпляра Telegram бота
 
 import telebot
+from bot.states.session_checkpoint import SessionCheckpointer
+from bot.states.state_store import create_state_store
+from bot.worker_pool import ChatOrderedPool
+from sql_db.background import PeriodicTask
 from config.settings import settings
 
 # Создаем экземпляр бота
 bot = telebot.TeleBot(settings.BOT_TOKEN)
 
-# Хранилище состояний пользователей
-# Формат: {user_id: {'state': 'learning', 'data': {...}}}
-user_states = {}
+# Обработчики выполняются в пуле с очередью на каждый чат:
+# обновления одного чата — строго по порядку, разные чаты — параллельно
+bot.worker_pool.close()
+bot.worker_pool = ChatOrderedPool(bot, num_threads=settings.BOT_WORKERS, max_pending=settings.BOT_MAX_PENDING,
+                                  stats_interval=settings.BOT_STATS_INTERVAL)
+
+# Хранилище состояний пользователей (settings.STATE_BACKEND)
+# Формат состояния: {'state': 'learning', 'data': {...}, 'version': 3}
+# Ограничено по числу пользователей (LRU) или по времени простоя (TTL)
+state_store = create_state_store()
+
+# Сессии обучения периодически сохраняются в БД и переживают перезапуск бота
+# (последние изменения сохраняются при остановке, см. app/main.py)
+session_checkpointer = SessionCheckpointer(
+    state_store, interval=settings.SESSION_CHECKPOINT_INTERVAL, max_age=settings.STATE_TTL
+)
+
+# Сколько раз update_user_data повторяет запись, если состояние параллельно изменили
+UPDATE_RETRIES = 5
+
+
+def log_state_store_size():
+    """Печатает количество живых состояний пользователей (метрика размера хранилища)."""
+    print(f'Состояний пользователей в хранилище: {state_store.size()}')
+
+
+# Размер хранилища печатается раз в BOT_STATS_INTERVAL секунд, как и нагрузка пула обработчиков
+if settings.BOT_STATS_INTERVAL > 0:
+    PeriodicTask('state-store-stats', settings.BOT_STATS_INTERVAL, log_state_store_size).start()
 
 
 def get_user_state(user_id: int) -> dict | None:
@@ -18,9 +48,10 @@ def get_user_state(user_id: int) -> dict | None:
         user_id (int): Telegram ID пользователя
 
     Returns:
-        dict | None: Состояние пользователя или None
+        dict | None: Копия состояния пользователя с версией или None.
+            Изменения нужно сохранить через save_user_state или update_user_data
     """
-    return user_states.get(user_id)
+    return state_store.get(user_id)
 
 
 def set_user_state(user_id: int, state: str, data: dict = None):
@@ -31,10 +62,11 @@ def set_user_state(user_id: int, state: str, data: dict = None):
         state (str): Название состояния
         data (dict): Дополнительные данные состояния
     """
-    user_states[user_id] = {
+    state_store.set(user_id, {
         'state': state,
         'data': data or {}
-    }
+    })
+    session_checkpointer.mark(user_id)
 
 
 def clear_user_state(user_id: int):
@@ -43,16 +75,56 @@ def clear_user_state(user_id: int):
     Args:
         user_id (int): Telegram ID пользователя
     """
-    if user_id in user_states:
-        del user_states[user_id]
+    state_store.delete(user_id)
+    session_checkpointer.mark(user_id)
+
+
+def save_user_state(user_id: int, state: dict) -> bool:
+    """Сохраняет измененное состояние, если его не изменили параллельно.
+
+    Args:
+        user_id (int): Telegram ID пользователя
+        state (dict): Состояние, полученное из get_user_state
+
+    Returns:
+        bool: True если сохранено, False если другой обработчик успел изменить состояние
+    """
+    if not state_store.compare_and_set(user_id, state, state['version']):
+        return False
+    session_checkpointer.mark(user_id)
+    return True
 
 
-def update_user_data(user_id: int, **kwargs):
+def restore_user_state(user_id: int) -> dict | None:
+    """Восстанавливает сессию обучения, сохраненную до перезапуска бота.
+
+    Args:
+        user_id (int): Telegram ID пользователя
+
+    Returns:
+        dict | None: Восстановленное состояние или None, если сохраненной сессии нет
+    """
+    return session_checkpointer.restore(user_id)
+
+
+def update_user_data(user_id: int, **kwargs) -> bool:
     """Обновляет данные в состоянии пользователя.
 
+    Состояние перечитывается и записывается заново (это же продлевает его TTL),
+    при параллельном изменении запись повторяется со свежим состоянием.
+
     Args:
         user_id (int): Telegram ID пользователя
         **kwargs: Данные для обновления
+
+    Returns:
+        bool: True если данные записаны, False если состояния нет
     """
-    if user_id in user_states:
-        user_states[user_id]['data'].update(kwargs)
+    for _ in range(UPDATE_RETRIES):
+        state = state_store.get(user_id)
+        if state is None:
+            return False
+        state['data'].update(kwargs)
+        if save_user_state(user_id, state):
+            return True
+    return False
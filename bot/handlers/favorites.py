@@ -5,7 +5,7 @@ from bot.states.learning_states import MenuButtons, CallbackData
 from bot.keyboards.main_menu import get_main_menu
 from bot.keyboards.learning_kb import get_word_card_keyboard
 from sql_db.db_init import get_session
-from sql_db.sql_requests.users import get_user
+from sql_db.sql_requests.users import get_user_by_tg_id
 from sql_db.sql_requests.words import get_user_favorites, remove_word_from_user_list
 
 
@@ -21,7 +21,7 @@ def handle_favorites(message):
     username = message.from_user.username or f'user_{user_tg_id}'
 
     with get_session() as session:
-        user_id = get_user(session, user_nickname=username)
+        user_id = get_user_by_tg_id(session, user_tg_id, user_nickname=username)
 
         if user_id is None:
             bot.send_message(
@@ -98,7 +98,7 @@ def handle_remove_word(call):
     translate_id = int(call.data.replace(CallbackData.REMOVE_WORD, ''))
 
     with get_session() as session:
-        user_id = get_user(session, user_nickname=username)
+        user_id = get_user_by_tg_id(session, user_tg_id, user_nickname=username)
 
         if user_id is None:
             bot.answer_callback_query(call.id, 'Ошибка: пользователь не найден')
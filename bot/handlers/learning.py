@@ -1,19 +1,58 @@
 # Handler режима обучения
 
 import random
-from bot.bot_instance import bot, get_user_state, set_user_state, update_user_data, clear_user_state
+from bot.bot_instance import (
+    bot, get_user_state, set_user_state, save_user_state, clear_user_state, restore_user_state
+)
 from bot.states.learning_states import States, MenuButtons, CallbackData
+from bot.states.learning_session import LearningSession
+from bot.states.seeded_session import SeededSession
 from bot.keyboards.main_menu import get_main_menu
-from bot.keyboards.learning_kb import get_answer_keyboard, get_result_keyboard, get_learning_menu
+from bot.keyboards.learning_kb import get_options_keyboard, get_result_keyboard, get_learning_menu
 from sql_db.db_init import get_session
-from sql_db.sql_requests.users import get_user
-from sql_db.sql_requests.learning import (
-    get_words_for_learning, record_attempt, get_wrong_options, get_word_progress
-)
+from sql_db.sql_requests.users import get_user_by_tg_id
+from sql_db.sql_requests.learning import get_words_for_learning, get_favorite_ids, record_attempt
 from sql_db.sql_requests.words import is_word_in_favorites
 from config.settings import settings
 
 
+def get_learning_state(call) -> dict | None:
+    """Возвращает состояние обучения пользователя, нажавшего кнопку квиза.
+
+    Если состояния нет (бот перезапускался), сессия восстанавливается из чекпоинта в БД.
+    Чекпоинт мог отстать от сообщения на экране, поэтому после восстановления
+    нажатие не обрабатывается, а текущий вопрос сессии отправляется заново.
+    Если состояние не возвращается, на нажатие уже ответили.
+
+    Args:
+        call (CallbackQuery): Нажатие кнопки
+
+    Returns:
+        dict | None: Состояние обучения или None, если обрабатывать нажатие не нужно
+    """
+    user_tg_id = call.from_user.id
+
+    state = get_user_state(user_tg_id)
+    if state is None:
+        state = restore_user_state(user_tg_id)
+        if state is not None and state['state'] == States.LEARNING:
+            learning = state['data']['session']
+            if learning.answered:
+                # На вопрос из чекпоинта уже ответили — продолжаем со следующего
+                with get_session() as session:
+                    learning.advance(session)
+                save_user_state(user_tg_id, state)
+
+            bot.answer_callback_query(call.id, 'Сессия восстановлена после перезапуска бота')
+            send_word_question(call.message.chat.id, user_tg_id)
+            return None
+
+    if state is None or state['state'] != States.LEARNING:
+        bot.answer_callback_query(call.id, 'Сессия обучения не активна')
+        return None
+    return state
+
+
 def send_word_question(chat_id: int, user_tg_id: int):
     """Отправляет следующий вопрос пользователю.
 
@@ -25,14 +64,21 @@ def send_word_question(chat_id: int, user_tg_id: int):
     if state is None or state['state'] != States.LEARNING:
         return
 
-    words = state['data'].get('words', [])
-    current_index = state['data'].get('current_index', 0)
+    learning = state['data']['session']
+
+    # Получаем текущее слово (текст пар главного словаря — из словаря в памяти)
+    session_size = len(learning)
+    current_word = None if learning.finished else learning.word()
+    if len(learning) != session_size:
+        # Удаленные пары убраны из сессии — сохраняем, чтобы ответ сверялся с показанным словом
+        save_user_state(user_tg_id, state)
 
     # Проверяем, есть ли еще слова
-    if current_index >= len(words):
+    if current_word is None:
         # Сессия завершена
-        correct_count = state['data'].get('correct_count', 0)
-        total_count = len(words)
+        correct_count = learning.correct_count
+        # Заданные вопросы (сессия могла закончиться досрочно)
+        total_count = learning.index
 
         clear_user_state(user_tg_id)
         set_user_state(user_tg_id, States.MAIN_MENU)
@@ -47,24 +93,18 @@ def send_word_question(chat_id: int, user_tg_id: int):
         bot.send_message(chat_id, result_text, reply_markup=get_main_menu())
         return
 
-    # Получаем текущее слово
-    current_word = words[current_index]
     translate_id = current_word['translate_id']
 
-    # Получаем неправильные варианты
-    with get_session() as session:
-        wrong_options = get_wrong_options(session, translate_id, count=3)
-
     # Формируем текст вопроса (показываем русское слово)
     word_ru = current_word['word_ru']
 
     question_text = f'📖 Переведи слово:\n\n*{word_ru}*'
-    question_text += f'\n\n_{current_index + 1} из {len(words)}_'
+    question_text += f'\n\n_{learning.index + 1} из {len(learning)}_'
 
-    # Создаем клавиатуру с ответами (английские варианты)
-    keyboard = get_answer_keyboard(
+    # Создаем клавиатуру с ответами (варианты собираются из словаря в памяти, в состоянии не хранятся)
+    keyboard = get_options_keyboard(
+        learning.options(current_word['word_en']),
         current_word['word_en'],
-        wrong_options,
         translate_id
     )
 
@@ -83,7 +123,7 @@ def handle_learn(message):
     username = message.from_user.username or f'user_{user_tg_id}'
 
     with get_session() as session:
-        user_id = get_user(session, user_nickname=username)
+        user_id = get_user_by_tg_id(session, user_tg_id, user_nickname=username)
 
         if user_id is None:
             bot.send_message(
@@ -92,10 +132,19 @@ def handle_learn(message):
             )
             return
 
-        # Получаем слова для обучения
-        words = get_words_for_learning(session, user_id)
+        if settings.LEARNING_SESSION_MODE == 'seeded':
+            # Сессия по зерну: слова и варианты ответа восстанавливаются из нескольких чисел
+            learning = SeededSession.start(session, user_id)
+        else:
+            # Получаем слова для обучения
+            words = get_words_for_learning(session, user_id)
+
+            # Перемешиваем слова и одним запросом получаем флаги избранного
+            random.shuffle(words)
+            favorite_ids = get_favorite_ids(session, user_id, [word['translate_id'] for word in words])
+            learning = LearningSession.from_words(user_id, words, favorite_ids) if words else None
 
-    if not words:
+    if learning is None:
         bot.send_message(
             message.chat.id,
             'К сожалению, в базе нет слов для изучения.\n'
@@ -104,20 +153,12 @@ def handle_learn(message):
         )
         return
 
-    # Перемешиваем слова
-    random.shuffle(words)
-
-    # Устанавливаем состояние обучения
-    set_user_state(user_tg_id, States.LEARNING, {
-        'words': words,
-        'current_index': 0,
-        'correct_count': 0,
-        'user_id': user_id
-    })
+    # Устанавливаем состояние обучения: в состоянии только компактная сессия (id пар и счетчики)
+    set_user_state(user_tg_id, States.LEARNING, {'session': learning})
 
     bot.send_message(
         message.chat.id,
-        f'🎓 Начинаем обучение!\nСлов в сессии: {len(words)}',
+        f'🎓 Начинаем обучение!\nСлов в сессии: {len(learning)}',
         reply_markup=get_learning_menu()
     )
 
@@ -129,11 +170,9 @@ def handle_learn(message):
 def handle_answer(call):
     """Обработчик ответа на вопрос."""
     user_tg_id = call.from_user.id
-    username = call.from_user.username or f'user_{user_tg_id}'
 
-    state = get_user_state(user_tg_id)
-    if state is None or state['state'] != States.LEARNING:
-        bot.answer_callback_query(call.id, 'Сессия обучения не активна')
+    state = get_learning_state(call)
+    if state is None:
         return
 
     # Парсим callback data: answer_translateId_isCorrect
@@ -141,33 +180,51 @@ def handle_answer(call):
     translate_id = int(parts[0])
     is_correct = parts[1] == '1'
 
-    words = state['data']['words']
-    current_index = state['data']['current_index']
-    current_word = words[current_index]
+    learning = state['data']['session']
+
+    if learning.finished:
+        # Сессия закончилась, пока вопрос был на экране (например, словарь сменил версию) — показываем итоги
+        bot.answer_callback_query(call.id)
+        send_word_question(call.message.chat.id, user_tg_id)
+        return
 
     # Проверяем, что ответ для текущего слова
-    if current_word['translate_id'] != translate_id:
+    if learning.current_id != translate_id:
         bot.answer_callback_query(call.id, 'Ответ для другого слова')
         return
 
-    with get_session() as session:
-        user_id = get_user(session, user_nickname=username)
-
-        # Записываем попытку
-        result = record_attempt(session, user_id, translate_id, is_correct)
+    if learning.answered:
+        bot.answer_callback_query(call.id, 'Ответ уже принят')
+        return
 
-        # Проверяем, в избранном ли слово
-        in_favorites = is_word_in_favorites(session, user_id, translate_id)
+    current_word = learning.word()
+    if current_word is None or current_word['translate_id'] != translate_id:
+        # Пару удалили после показа вопроса — показываем следующее слово (или итоги)
+        bot.answer_callback_query(call.id, 'Слово больше недоступно')
+        send_word_question(call.message.chat.id, user_tg_id)
+        return
 
-    # Обновляем счетчик правильных ответов
+    # Отмечаем ответ и обновляем счетчик правильных ответов.
+    # Если то же нажатие параллельно обработал другой процесс, версия состояния уже другая
+    learning.answered = True
     if is_correct:
-        update_user_data(user_tg_id, correct_count=state['data']['correct_count'] + 1)
+        learning.correct_count += 1
+    if not save_user_state(user_tg_id, state):
+        bot.answer_callback_query(call.id, 'Ответ уже принят')
+        return
+
+    # Единственное обращение к БД за ответ — запись попытки
+    # (и проверка избранного, если сессия его не хранит)
+    with get_session() as session:
+        result = record_attempt(session, learning.user_id, translate_id, is_correct)
+        if current_word['in_favorites'] is None:
+            current_word['in_favorites'] = is_word_in_favorites(session, learning.user_id, translate_id)
 
     # Формируем сообщение с результатом
     word_en = current_word['word_en']
     word_ru = current_word['word_ru']
-    transcription = current_word.get('transcription')
-    is_user_word = current_word.get('is_user_word', False)
+    transcription = current_word['transcription']
+    is_user_word = current_word['is_user_word']
 
     if is_correct:
         result_emoji = '✅'
@@ -195,7 +252,7 @@ def handle_answer(call):
     full_text = f'{result_emoji} {result_text}{word_info}'
 
     # Создаем клавиатуру с действиями
-    keyboard = get_result_keyboard(translate_id, in_favorites, is_user_word)
+    keyboard = get_result_keyboard(translate_id, current_word['in_favorites'], is_user_word)
 
     # Обновляем сообщение
     bot.edit_message_text(
@@ -214,14 +271,28 @@ def handle_next_word(call):
     """Обработчик кнопки "Дальше"."""
     user_tg_id = call.from_user.id
 
-    state = get_user_state(user_tg_id)
-    if state is None or state['state'] != States.LEARNING:
-        bot.answer_callback_query(call.id, 'Сессия обучения не активна')
+    state = get_learning_state(call)
+    if state is None:
+        return
+
+    learning = state['data']['session']
+    if learning.finished:
+        # Сессия закончилась без перехода к следующему слову — показываем итоги
+        bot.answer_callback_query(call.id)
+        send_word_question(call.message.chat.id, user_tg_id)
+        return
+
+    # Кнопка "Дальше" есть только под ответом: повторное нажатие не пропускает слово
+    if not learning.answered:
+        bot.answer_callback_query(call.id)
         return
 
-    # Увеличиваем индекс текущего слова
-    current_index = state['data']['current_index'] + 1
-    update_user_data(user_tg_id, current_index=current_index)
+    # Переходим к следующему слову (сессия по зерну пропускает выученные слова)
+    with get_session() as session:
+        learning.advance(session)
+    if not save_user_state(user_tg_id, state):
+        bot.answer_callback_query(call.id)
+        return
 
     bot.answer_callback_query(call.id)
 
@@ -268,7 +339,7 @@ def handle_add_to_favorites(call):
 
     with get_session() as session:
         from sql_db.sql_requests.words import add_to_favorites
-        user_id = get_user(session, user_nickname=username)
+        user_id = get_user_by_tg_id(session, user_tg_id, user_nickname=username)
 
         if user_id is None:
             bot.answer_callback_query(call.id, 'Ошибка: пользователь не найден')
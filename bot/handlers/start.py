@@ -17,7 +17,7 @@ def cmd_start(message):
     username = message.from_user.username or f'user_{user_tg_id}'
 
     with get_session() as session:
-        user_id = get_or_create_user(session, username)
+        user_id = get_or_create_user(session, username, tg_id=user_tg_id)
 
         if user_id is None:
             bot.send_message(
@@ -4,7 +4,7 @@ from bot.bot_instance import bot
 from bot.states.learning_states import MenuButtons
 from bot.keyboards.main_menu import get_main_menu
 from sql_db.db_init import get_session
-from sql_db.sql_requests.users import get_user
+from sql_db.sql_requests.users import get_user_by_tg_id
 from sql_db.sql_requests.learning import get_user_stats
 
 
@@ -30,7 +30,7 @@ def show_stats(message):
     username = message.from_user.username or f'user_{user_tg_id}'
 
     with get_session() as session:
-        user_id = get_user(session, user_nickname=username)
+        user_id = get_user_by_tg_id(session, user_tg_id, user_nickname=username)
 
         if user_id is None:
             bot.send_message(
@@ -4,7 +4,7 @@ from bot.bot_instance import bot, get_user_state, set_user_state, clear_user_sta
 from bot.states.learning_states import States, MenuButtons
 from bot.keyboards.main_menu import get_main_menu, get_cancel_menu
 from sql_db.db_init import get_session
-from sql_db.sql_requests.users import get_user
+from sql_db.sql_requests.users import get_user_by_tg_id
 from sql_db.sql_requests.words import add_user_word
 
 
@@ -99,7 +99,7 @@ def handle_word_ru_input(message):
 
     # Добавляем слово в базу
     with get_session() as session:
-        user_id = get_user(session, user_nickname=username)
+        user_id = get_user_by_tg_id(session, user_tg_id, user_nickname=username)
 
         if user_id is None:
             bot.send_message(
@@ -1,17 +1,16 @@
 # Клавиатуры для режима обучения
 
-import random
 from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
 from bot.states.learning_states import MenuButtons, CallbackData
 
 
-def get_answer_keyboard(correct_word: str, wrong_words: list[str],
-                        translate_id: int) -> InlineKeyboardMarkup:
-    """Создает клавиатуру с вариантами ответов.
+def get_options_keyboard(options: list[str], correct_word: str,
+                         translate_id: int) -> InlineKeyboardMarkup:
+    """Создает клавиатуру с заранее перемешанными вариантами ответов.
 
     Args:
+        options (list[str]): Варианты ответа в порядке показа
         correct_word (str): Правильный ответ (английское слово)
-        wrong_words (list[str]): Список неправильных вариантов
         translate_id (int): id пары слов для проверки
 
     Returns:
@@ -19,13 +18,10 @@ def get_answer_keyboard(correct_word: str, wrong_words: list[str],
     """
     keyboard = InlineKeyboardMarkup(row_width=2)
 
-    # Собираем все варианты и перемешиваем
-    all_options = [(correct_word, True)] + [(w, False) for w in wrong_words]
-    random.shuffle(all_options)
-
     # Создаем кнопки
     buttons = []
-    for word, is_correct in all_options:
+    for word in options:
+        is_correct = word == correct_word
         callback_data = f'{CallbackData.ANSWER}{translate_id}_{1 if is_correct else 0}'
         buttons.append(InlineKeyboardButton(word, callback_data=callback_data))
 
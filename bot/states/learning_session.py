@@ -0,0 +1,220 @@
+# Компактная сессия обучения
+#
+# Вместо списка из WORDS_PER_SESSION словарей со всеми полями слова
+# сессия хранит массив id пар и байтовые флаги. Текст пар главного словаря
+# восстанавливается из dictionary_store при показе, текст хранится только
+# для личных слов пользователя (их нет в главном словаре).
+# Варианты ответа не хранятся — они собираются при показе вопроса.
+#
+# Для внешних хранилищ состояний сессия сериализуется в несколько сотен байт (to_bytes):
+#     заголовок SESSION_HEADER: user_id, index, correct_count, количество слов, флаг ответа
+#     translate_ids (int32 little-endian), flags (по байту на слово)
+#     личные слова — JSON-список [translate_id, word_en, word_ru, transcription] (если есть)
+
+import json
+import random
+import struct
+import sys
+from array import array
+
+from sqlalchemy.orm import Session
+
+from sql_db.db_init import get_session
+from sql_db.dictionary_cache import dictionary_store, distractor_pool
+from sql_db.sql_requests.words import get_global_pairs
+
+
+# Битовые флаги слова сессии
+IN_FAVORITES = 1
+IS_USER_WORD = 2
+
+SESSION_HEADER = struct.Struct('<iHHH?')
+
+
+class LearningSession:
+    """Состояние сессии обучения одного пользователя.
+
+    Args:
+        user_id (int): id пользователя в БД
+        translate_ids (array): id пар сессии в порядке показа
+        flags (array): Флаги слов (IN_FAVORITES, IS_USER_WORD), по одному байту на слово
+        personal (dict | None): Текст слов, которых нет в главном словаре:
+            translate_id → (word_en, word_ru, transcription)
+    """
+
+    __slots__ = ('user_id', 'translate_ids', 'flags', 'personal', 'index', 'correct_count', 'answered')
+
+    def __init__(self, user_id: int, translate_ids: array, flags: array, personal: dict | None = None):
+        self.user_id = user_id
+        self.translate_ids = translate_ids
+        self.flags = flags
+        self.personal = personal or None
+        self.index = 0
+        self.correct_count = 0
+        # На текущее слово уже ответили (повторное нажатие не засчитывается)
+        self.answered = False
+
+    @classmethod
+    def from_words(cls, user_id: int, words: list[dict], favorite_ids: set[int]) -> 'LearningSession':
+        """Создает сессию из слов get_words_for_learning.
+
+        Args:
+            user_id (int): id пользователя в БД
+            words (list[dict]): Слова сессии в порядке показа
+            favorite_ids (set[int]): id пар сессии, которые уже в избранном
+
+        Returns:
+            LearningSession: Новая сессия
+        """
+        translate_ids, flags = array('i'), array('b')
+        personal = {}
+
+        for word in words:
+            translate_id = word['translate_id']
+            flag = IN_FAVORITES if translate_id in favorite_ids else 0
+            if word.get('is_user_word'):
+                flag |= IS_USER_WORD
+            # Текст, который нельзя восстановить из главного словаря, храним в сессии
+            if flag & IS_USER_WORD or translate_id not in dictionary_store:
+                personal[translate_id] = (word['word_en'], word['word_ru'], word.get('transcription'))
+
+            translate_ids.append(translate_id)
+            flags.append(flag)
+
+        return cls(user_id, translate_ids, flags, personal)
+
+    def to_bytes(self) -> bytes:
+        """Сериализует сессию для внешнего хранилища состояний."""
+        translate_ids = self.translate_ids
+        if sys.byteorder != 'little':
+            translate_ids = array('i', translate_ids)
+            translate_ids.byteswap()
+
+        parts = [
+            SESSION_HEADER.pack(self.user_id, self.index, self.correct_count, len(self.translate_ids), self.answered),
+            translate_ids.tobytes(),
+            self.flags.tobytes(),
+        ]
+        if self.personal:
+            parts.append(json.dumps([[translate_id, *text] for translate_id, text in self.personal.items()],
+                                    ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> 'LearningSession':
+        """Восстанавливает сессию из результата to_bytes.
+
+        Args:
+            payload (bytes): Сериализованная сессия
+
+        Returns:
+            LearningSession: Сессия
+        """
+        user_id, index, correct_count, count, answered = SESSION_HEADER.unpack_from(payload)
+        position = SESSION_HEADER.size
+
+        translate_ids = array('i', payload[position:position + 4 * count])
+        if sys.byteorder != 'little':
+            translate_ids.byteswap()
+        position += 4 * count
+        flags = array('b', payload[position:position + count])
+        position += count
+
+        personal = None
+        if position < len(payload):
+            personal = {translate_id: tuple(text) for translate_id, *text in json.loads(payload[position:])}
+
+        session = cls(user_id, translate_ids, flags, personal)
+        session.index = index
+        session.correct_count = correct_count
+        session.answered = answered
+        return session
+
+    def __len__(self) -> int:
+        return len(self.translate_ids)
+
+    @property
+    def finished(self) -> bool:
+        """Все слова сессии показаны."""
+        return self.index >= len(self.translate_ids)
+
+    @property
+    def current_id(self) -> int:
+        """id пары текущего слова."""
+        return self.translate_ids[self.index]
+
+    def advance(self, session: Session | None = None):
+        """Переходит к следующему слову.
+
+        Args:
+            session (Session | None): Сессия БД (не нужна, слова сессии уже выбраны)
+        """
+        self.index += 1
+        self.answered = False
+
+    def options(self, word_en: str, count: int = 3) -> list[str]:
+        """Перемешанные варианты ответа на текущий вопрос (правильный и count неправильных).
+
+        Args:
+            word_en (str): Правильный ответ — английское слово текущего вопроса из word()
+            count (int): Количество неправильных вариантов
+        """
+        options = [word_en] + distractor_pool.sample(count, exclude_word=word_en)
+        random.shuffle(options)
+        return options
+
+    def _fetch_missing(self, translate_id: int) -> dict | None:
+        """Дочитывает из БД пару, которой нет в словаре в памяти (словарь перезагрузился
+        после начала сессии), и запоминает ее текст в сессии.
+
+        Returns:
+            dict | None: Пара или None, если ее удалили из БД
+        """
+        with get_session() as session:
+            pairs = get_global_pairs(session, [translate_id])
+        if not pairs:
+            return None
+
+        word = pairs[0]
+        if self.personal is None:
+            self.personal = {}
+        self.personal[translate_id] = (word['word_en'], word['word_ru'], word['transcription'])
+        return word
+
+    def word(self, index: int | None = None) -> dict | None:
+        """Возвращает слово сессии с текстом и флагами.
+
+        Пары, которых уже нет ни в словаре, ни в БД, убираются из сессии —
+        возвращается следующее за ними слово.
+
+        Args:
+            index (int | None): Номер слова в сессии, по умолчанию текущее
+
+        Returns:
+            dict | None: {'translate_id', 'word_en', 'word_ru', 'transcription', 'in_favorites', 'is_user_word'}
+                или None, если после удаленных пар слов в сессии не осталось
+        """
+        if index is None:
+            index = self.index
+
+        while index < len(self.translate_ids):
+            translate_id = self.translate_ids[index]
+            flag = self.flags[index]
+
+            if self.personal and translate_id in self.personal:
+                word_en, word_ru, transcription = self.personal[translate_id]
+                word = {'translate_id': translate_id, 'word_en': word_en,
+                        'word_ru': word_ru, 'transcription': transcription}
+            else:
+                word = dictionary_store.get(translate_id) or self._fetch_missing(translate_id)
+                if word is None:
+                    print(f'Пара {translate_id} удалена, пропускаем ее в сессии пользователя {self.user_id}')
+                    del self.translate_ids[index]
+                    del self.flags[index]
+                    continue
+
+            word['in_favorites'] = bool(flag & IN_FAVORITES)
+            word['is_user_word'] = bool(flag & IS_USER_WORD)
+            return word
+
+        return None
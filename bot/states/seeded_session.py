@@ -0,0 +1,221 @@
+# Детерминированная сессия обучения по зерну
+#
+# Сессия не хранит список слов: только зерно, версию словаря и курсор.
+# Кандидаты — псевдослучайная перестановка пар главного словаря этой версии:
+#     кандидат k = translate_ids[permute(k)], где permute — сеть Фейстеля с ключами из зерна
+#     (номер вне словаря прогоняется через сеть повторно, пока не попадет в словарь)
+# Вопрос и его неправильные варианты восстанавливаются из зерна в любом процессе
+# и после перезапуска бота, пока версия словаря не изменилась.
+# Выученные слова пропускаются при переходе к следующему вопросу (курсор идет дальше):
+# сначала кандидаты проверяются блоками по SEEK_BLOCK, а если за SEEK_ROUNDS блоков
+# невыученное слово не нашлось, выученные пары пользователя читаются одним запросом
+# и дальше кандидаты перебираются в памяти.
+#
+# В сессию попадают только слова главного словаря: личные слова и избранное
+# меняются во время сессии и из зерна не восстанавливаются.
+
+import random
+import struct
+
+from sqlalchemy.orm import Session
+
+from sql_db.dictionary_cache import DictionaryData, dictionary_store, distractor_pool
+from sql_db.sql_requests.learning import check_and_reset_stale_progress, get_memorized_ids
+from config.settings import settings
+
+
+# user_id, зерно, версия словаря, курсор, номер вопроса, количество вопросов, правильных ответов, флаг ответа
+SEEDED_HEADER = struct.Struct('<iqqIHHH?')
+# Сколько кандидатов проверять на «выучено» одним запросом
+SEEK_BLOCK = 8
+# Сколько блоков проверять запросами, прежде чем прочитать все выученные пары пользователя
+SEEK_ROUNDS = 3
+# Раунды сети Фейстеля перестановки кандидатов
+PERMUTATION_ROUNDS = 4
+
+
+class SeededSession:
+    """Сессия обучения, которая восстанавливается из нескольких чисел.
+
+    Args:
+        user_id (int): id пользователя в БД
+        seed (int): Зерно сессии
+        version (int): Версия главного словаря, по которой выбираются слова
+        count (int): Количество вопросов в сессии
+    """
+
+    __slots__ = ('user_id', 'seed', 'version', 'count', 'cursor', 'index', 'correct_count', 'answered', '_keys')
+
+    def __init__(self, user_id: int, seed: int, version: int, count: int):
+        self.user_id = user_id
+        self.seed = seed
+        self.version = version
+        self.count = count
+        # Позиция текущего слова в перестановке кандидатов
+        self.cursor = 0
+        # Номер текущего вопроса
+        self.index = 0
+        self.correct_count = 0
+        self.answered = False
+        # Ключи раундов перестановки (из зерна, не сериализуются)
+        rng = random.Random(seed)
+        self._keys = [rng.getrandbits(32) for _ in range(PERMUTATION_ROUNDS)]
+
+    @classmethod
+    def start(cls, session: Session, user_id: int, count: int = None) -> 'SeededSession | None':
+        """Начинает новую сессию со случайным зерном.
+
+        Args:
+            session (Session): Сессия подключения к БД
+            user_id (int): id пользователя в БД
+            count (int): Количество вопросов, по умолчанию settings.WORDS_PER_SESSION
+
+        Returns:
+            SeededSession | None: Сессия или None, если невыученных слов в словаре нет
+        """
+        if count is None:
+            count = settings.WORDS_PER_SESSION
+
+        # Как и get_words_for_learning, сначала сбрасываем устаревший прогресс
+        if settings.STALE_RESET_MODE == 'session':
+            check_and_reset_stale_progress(session, user_id)
+
+        data = dictionary_store.data(session)
+        if not data.translate_ids:
+            return None
+        learning = cls(user_id, random.getrandbits(62), data.version, min(count, len(data.translate_ids)))
+
+        cursor = learning._seek(session, data, 0)
+        if cursor is None:
+            return None
+        learning.cursor = cursor
+        return learning
+
+    def to_bytes(self) -> bytes:
+        """Сериализует сессию для внешнего хранилища состояний."""
+        return SEEDED_HEADER.pack(self.user_id, self.seed, self.version, self.cursor,
+                                  self.index, self.count, self.correct_count, self.answered)
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> 'SeededSession':
+        """Восстанавливает сессию из результата to_bytes.
+
+        Args:
+            payload (bytes): Сериализованная сессия
+
+        Returns:
+            SeededSession: Сессия
+        """
+        user_id, seed, version, cursor, index, count, correct_count, answered = SEEDED_HEADER.unpack(payload)
+        learning = cls(user_id, seed, version, count)
+        learning.cursor = cursor
+        learning.index = index
+        learning.correct_count = correct_count
+        learning.answered = answered
+        return learning
+
+    def _permute(self, position: int, size: int) -> int:
+        """Номер в словаре размера size для кандидата position (биекция на [0, size))."""
+        half = max(1, ((size - 1).bit_length() + 1) // 2)
+        mask = (1 << half) - 1
+        keys = self._keys
+
+        # Сеть переставляет [0, 4^half), это не больше 4 * size: в среднем до 4 прогонов
+        while True:
+            left, right = position >> half, position & mask
+            for key in keys:
+                left, right = right, left ^ ((((right ^ key) * 0x9E3779B1) >> 11) & mask)
+            position = (left << half) | right
+            if position < size:
+                return position
+
+    def _candidate(self, data: DictionaryData, position: int) -> int:
+        """id пары кандидата с номером position."""
+        return data.translate_ids[self._permute(position, len(data.translate_ids))]
+
+    def _seek(self, session: Session, data: DictionaryData, position: int) -> int | None:
+        """Ищет первого невыученного кандидата, начиная с position.
+
+        Returns:
+            int | None: Номер кандидата или None, если невыученных слов не осталось
+        """
+        size = len(data.translate_ids)
+
+        for _ in range(SEEK_ROUNDS):
+            if position >= size:
+                return None
+            block = [self._candidate(data, k) for k in range(position, min(position + SEEK_BLOCK, size))]
+            memorized = get_memorized_ids(session, self.user_id, block)
+            for offset, translate_id in enumerate(block):
+                if translate_id not in memorized:
+                    return position + offset
+            position += len(block)
+
+        # Подряд одни выученные слова — дальше проверяем по всем выученным парам в памяти
+        memorized = get_memorized_ids(session, self.user_id)
+        for k in range(position, size):
+            if self._candidate(data, k) not in memorized:
+                return k
+        return None
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def finished(self) -> bool:
+        """Все вопросы заданы или словарь сменил версию (слова из зерна уже не восстановить)."""
+        return self.index >= self.count or dictionary_store.data().version != self.version
+
+    @property
+    def current_id(self) -> int:
+        """id пары текущего слова."""
+        return self._candidate(dictionary_store.data(), self.cursor)
+
+    def advance(self, session: Session | None = None):
+        """Переходит к следующему невыученному слову.
+
+        Args:
+            session (Session | None): Сессия БД для проверки выученных слов
+        """
+        self.index += 1
+        self.answered = False
+        if self.finished:
+            return
+
+        cursor = self._seek(session, dictionary_store.data(session), self.cursor + 1)
+        if cursor is None:
+            # Невыученные слова закончились — сессия завершается досрочно
+            self.count = self.index
+            return
+        self.cursor = cursor
+
+    def options(self, word_en: str, count: int = 3) -> list[str]:
+        """Варианты ответа на текущий вопрос, одинаковые при каждом восстановлении.
+
+        Args:
+            word_en (str): Правильный ответ — английское слово текущего вопроса из word()
+            count (int): Количество неправильных вариантов
+        """
+        rng = random.Random(f'{self.seed}:{self.cursor}')
+        options = [word_en] + distractor_pool.sample(count, exclude_word=word_en, rng=rng)
+        rng.shuffle(options)
+        return options
+
+    def word(self) -> dict | None:
+        """Возвращает текущее слово с текстом.
+
+        Returns:
+            dict | None: {'translate_id', 'word_en', 'word_ru', 'transcription', 'in_favorites', 'is_user_word'},
+                in_favorites = None — в сессии не хранится, проверяется по БД.
+                None, если словарь сменил версию (сессия завершается досрочно)
+        """
+        # Кандидат и его текст — из одной загрузки словаря (между вызовами словарь могут перезагрузить)
+        data = dictionary_store.data()
+        word = data.pair(self._candidate(data, self.cursor)) if data.version == self.version else None
+        if word is None:
+            self.count = self.index
+            return None
+
+        word['in_favorites'] = None
+        word['is_user_word'] = False
+        return word
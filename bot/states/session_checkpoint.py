@@ -0,0 +1,112 @@
+# Чекпоинт сессий обучения в БД
+#
+# Хранилище состояний в памяти процесса теряется при перезапуске бота,
+# и все, кто был посреди квиза, начинали бы сессию заново. Поэтому состояния
+# режима обучения периодически сохраняются в таблицу learning_session:
+#     - измененные состояния помечаются (mark) и пишутся одним upsert раз в interval секунд
+#     - при остановке бота (close) записывается остаток
+#     - после перезапуска состояние восстанавливается при первом нажатии кнопки квиза (restore)
+# Сохраненные сессии старше max_age секунд удаляются при записи.
+
+import struct
+import threading
+
+from bot.states.learning_states import States
+from bot.states.state_codec import encode_state, decode_state
+from bot.states.state_store import StateStore
+from sql_db.background import PeriodicTask
+from sql_db.db_init import get_session
+from sql_db.sql_requests.sessions import (
+    save_learning_sessions, delete_learning_sessions, load_learning_session, delete_expired_learning_sessions
+)
+
+
+class SessionCheckpointer:
+    """Периодическое сохранение сессий обучения из хранилища состояний в БД.
+
+    Args:
+        store (StateStore): Хранилище состояний бота
+        interval (float): Интервал записи в секундах
+        max_age (int): Время жизни сохраненной сессии в секундах
+    """
+
+    def __init__(self, store: StateStore, interval: float, max_age: int):
+        self._store = store
+        self._max_age = max_age
+        # Пользователи, чье состояние изменилось после последней записи
+        self._dirty: set[int] = set()
+        self._lock = threading.Lock()
+        self._task = PeriodicTask('learning-session-checkpoint', interval, self.flush)
+
+    def mark(self, user_id: int):
+        """Помечает состояние пользователя для записи в следующий чекпоинт.
+
+        Args:
+            user_id (int): Telegram ID пользователя
+        """
+        with self._lock:
+            self._dirty.add(user_id)
+        self._task.start()
+
+    def flush(self) -> int:
+        """Записывает помеченные состояния в БД.
+
+        Сессии обучения сохраняются, сохраненные сессии пользователей,
+        вышедших из режима обучения, удаляются.
+
+        Returns:
+            int: Количество сохраненных сессий
+        """
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+
+        payloads = {}
+        finished = []
+        for user_id in dirty:
+            state = self._store.get(user_id)
+            if state is not None and state['state'] == States.LEARNING:
+                payloads[user_id] = encode_state(state)
+            else:
+                finished.append(user_id)
+
+        try:
+            with get_session() as session:
+                save_learning_sessions(session, payloads)
+                delete_learning_sessions(session, finished)
+                delete_expired_learning_sessions(session, self._max_age)
+        except Exception:
+            # БД недоступна — попробуем в следующий раз
+            with self._lock:
+                self._dirty |= dirty
+            raise
+
+        return len(payloads)
+
+    def restore(self, user_id: int) -> dict | None:
+        """Восстанавливает сессию обучения пользователя из БД в хранилище состояний.
+
+        Args:
+            user_id (int): Telegram ID пользователя
+
+        Returns:
+            dict | None: Восстановленное состояние (как из get_user_state) или None
+        """
+        with get_session() as session:
+            payload = load_learning_session(session, user_id, self._max_age)
+
+        if payload is None:
+            return None
+
+        try:
+            state = decode_state(payload)
+        except (ValueError, KeyError, struct.error) as e:
+            print(f'Сохраненная сессия пользователя {user_id} не прочитана: {e}')
+            return None
+
+        self._store.set(user_id, state)
+        return self._store.get(user_id)
+
+    def close(self):
+        """Останавливает периодическую запись и сохраняет остаток."""
+        self._task.stop()
+        self.flush()
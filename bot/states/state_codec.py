@@ -0,0 +1,73 @@
+# Компактная сериализация состояний пользователей
+#
+# Внешние хранилища (SQLite, Redis) держат состояние как строку байт:
+#     заголовок STATE_HEADER: версия формата, длина имени состояния, длина JSON данных, вид сессии
+#     имя состояния (UTF-8)
+#     данные состояния без сессии обучения — JSON (обычно пустой или {"word_en": ...})
+#     сессия обучения to_bytes() (если есть)
+# Сессия из 20 слов занимает около 120 байт вместо нескольких КБ JSON со словарями слов,
+# сессия по зерну (SeededSession) — 31 байт.
+
+import json
+import struct
+
+from bot.states.learning_session import LearningSession
+from bot.states.seeded_session import SeededSession
+
+
+FORMAT_VERSION = 2
+STATE_HEADER = struct.Struct('<BBHB')
+# Ключ данных состояния, в котором лежит сессия обучения
+SESSION_KEY = 'session'
+# Вид сессии в заголовке → класс (0 — сессии нет)
+SESSION_CLASSES = {1: LearningSession, 2: SeededSession}
+SESSION_KINDS = {cls: kind for kind, cls in SESSION_CLASSES.items()}
+
+
+def encode_state(state: dict) -> bytes:
+    """Сериализует состояние пользователя.
+
+    Args:
+        state (dict): Состояние {'state': str, 'data': dict}
+
+    Returns:
+        bytes: Сериализованное состояние
+    """
+    name = state['state'].encode('utf-8')
+    data = dict(state['data'])
+    session = data.pop(SESSION_KEY, None)
+
+    data_json = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8') if data else b''
+
+    kind = SESSION_KINDS[type(session)] if session is not None else 0
+
+    parts = [STATE_HEADER.pack(FORMAT_VERSION, len(name), len(data_json), kind), name, data_json]
+    if session is not None:
+        parts.append(session.to_bytes())
+    return b''.join(parts)
+
+
+def decode_state(payload: bytes) -> dict:
+    """Восстанавливает состояние пользователя из результата encode_state.
+
+    Args:
+        payload (bytes): Сериализованное состояние
+
+    Returns:
+        dict: Состояние {'state': str, 'data': dict}
+    """
+    format_version, name_size, data_size, kind = STATE_HEADER.unpack_from(payload)
+    if format_version != FORMAT_VERSION:
+        raise ValueError(f'неизвестный формат состояния: {format_version}')
+
+    position = STATE_HEADER.size
+    name = payload[position:position + name_size].decode('utf-8')
+    position += name_size
+
+    data = json.loads(payload[position:position + data_size]) if data_size else {}
+    position += data_size
+
+    if kind:
+        data[SESSION_KEY] = SESSION_CLASSES[kind].from_bytes(payload[position:])
+
+    return {'state': name, 'data': data}
@@ -0,0 +1,307 @@
+# Хранилища состояний пользователей бота
+#
+# Состояние пользователя — словарь {'state': str, 'data': dict}.
+# Хранилище ограничено по размеру (LRU) или по времени жизни записи (TTL):
+# пользователь, бросивший сессию обучения, не держит память вечно.
+#
+# Состояния хранятся сериализованными (state_codec) вместе с номером версии.
+# get() возвращает копию состояния с ключом 'version', compare_and_set() записывает
+# состояние, только если его версия не изменилась с момента чтения (оптимистичная
+# блокировка). Так несколько процессов бота могут обслуживать одного пользователя:
+# повторное нажатие кнопки, обработанное параллельно, не засчитается дважды.
+#
+# Реализации:
+#     MemoryStateStore — в памяти процесса (один процесс бота)
+#     SqliteStateStore — файл SQLite (несколько процессов на одной машине, тесты)
+#     RedisStateStore  — сервер с протоколом Redis (несколько машин)
+
+import os
+import sqlite3
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from bot.states.state_codec import encode_state, decode_state
+from sql_db.lru_cache import LRUCache
+from config.settings import settings
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class StateStore(ABC):
+    """Базовый интерфейс хранилища состояний пользователей.
+
+    Реализации хранят пары (версия, сериализованное состояние) и определяют
+    _read, _write, _write_if, delete и size.
+    """
+
+    def get(self, user_id: int) -> dict | None:
+        """Возвращает состояние пользователя или None.
+
+        Args:
+            user_id (int): Telegram ID пользователя
+
+        Returns:
+            dict | None: Копия состояния {'state', 'data', 'version'}
+        """
+        item = self._read(user_id)
+        if item is None:
+            return None
+
+        version, payload = item
+        try:
+            state = decode_state(payload)
+        except (ValueError, KeyError, struct.error) as e:
+            # Состояние в старом формате (после обновления бота) считается потерянным
+            print(f'Состояние пользователя {user_id} не прочитано: {e}')
+            return None
+        state['version'] = version
+        return state
+
+    def set(self, user_id: int, state: dict) -> int:
+        """Сохраняет состояние пользователя без проверки версии.
+
+        Args:
+            user_id (int): Telegram ID пользователя
+            state (dict): Состояние {'state', 'data'}
+
+        Returns:
+            int: Новая версия состояния
+        """
+        return self._write(user_id, encode_state(state))
+
+    def compare_and_set(self, user_id: int, state: dict, version: int) -> bool:
+        """Сохраняет состояние, если с момента чтения его никто не изменил.
+
+        Args:
+            user_id (int): Telegram ID пользователя
+            state (dict): Состояние {'state', 'data'}
+            version (int): Версия, полученная вместе с состоянием в get()
+
+        Returns:
+            bool: True если записано, False если состояние изменилось или удалено
+        """
+        return self._write_if(user_id, encode_state(state), version)
+
+    @abstractmethod
+    def delete(self, user_id: int):
+        """Удаляет состояние пользователя."""
+
+    @abstractmethod
+    def size(self) -> int:
+        """Количество живых состояний (метрика размера хранилища)."""
+
+    @abstractmethod
+    def _read(self, user_id: int) -> tuple[int, bytes] | None:
+        """Версия и сериализованное состояние пользователя или None."""
+
+    @abstractmethod
+    def _write(self, user_id: int, payload: bytes) -> int:
+        """Записывает состояние и возвращает его новую версию."""
+
+    @abstractmethod
+    def _write_if(self, user_id: int, payload: bytes, version: int) -> bool:
+        """Записывает состояние, если его текущая версия равна version."""
+
+
+class MemoryStateStore(StateStore):
+    """Состояния в памяти процесса с LRU-вытеснением и TTL.
+
+    Args:
+        maxsize (int): Максимальное количество состояний, самые давние вытесняются
+        ttl (float): Секунд без изменений, после которых состояние удаляется
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._states = LRUCache(maxsize=maxsize, ttl=ttl)
+        # Чтение версии и запись в _write_if должны быть одной операцией
+        self._lock = threading.Lock()
+
+    def _read(self, user_id: int) -> tuple[int, bytes] | None:
+        return self._states.get(user_id)
+
+    def _write(self, user_id: int, payload: bytes) -> int:
+        with self._lock:
+            item = self._states.get(user_id)
+            version = item[0] + 1 if item is not None else 1
+            self._states.set(user_id, (version, payload))
+        return version
+
+    def _write_if(self, user_id: int, payload: bytes, version: int) -> bool:
+        with self._lock:
+            item = self._states.get(user_id)
+            if item is None or item[0] != version:
+                return False
+            self._states.set(user_id, (version + 1, payload))
+        return True
+
+    def delete(self, user_id: int):
+        with self._lock:
+            self._states.pop(user_id)
+
+    def size(self) -> int:
+        self._states.purge_expired()
+        return len(self._states)
+
+
+# Не чаще раза в столько секунд удалять устаревшие записи из файла SQLite при записи
+SQLITE_PURGE_INTERVAL = 60
+
+
+class SqliteStateStore(StateStore):
+    """Состояния в файле SQLite, общем для процессов бота на одной машине.
+
+    Каждый поток (и каждый процесс после fork) открывает свое соединение.
+    Устаревшие записи не читаются и удаляются при записи (не чаще раза
+    в SQLITE_PURGE_INTERVAL секунд) и при вызове size().
+
+    Args:
+        path (str): Путь к файлу базы SQLite
+        ttl (float): Секунд без изменений, после которых состояние удаляется
+    """
+
+    def __init__(self, path: str, ttl: float):
+        self._path = path
+        self._ttl = ttl
+        self._local = threading.local()
+        self._purged_at = 0.0
+        connection = self._connect()
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS user_states ('
+            'user_id INTEGER PRIMARY KEY, version INTEGER NOT NULL, '
+            'expires_at REAL NOT NULL, payload BLOB NOT NULL)'
+        )
+        connection.execute('CREATE INDEX IF NOT EXISTS ix_user_states_expires_at ON user_states (expires_at)')
+
+    def _connect(self) -> sqlite3.Connection:
+        """Соединение текущего потока (новое после fork)."""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.connection = sqlite3.connect(self._path, timeout=10, isolation_level=None)
+            local.connection.execute('PRAGMA journal_mode=WAL')
+            local.pid = os.getpid()
+        return local.connection
+
+    def _read(self, user_id: int) -> tuple[int, bytes] | None:
+        return self._connect().execute(
+            'SELECT version, payload FROM user_states WHERE user_id = ? AND expires_at >= ?',
+            (user_id, time.time())
+        ).fetchone()
+
+    def _purge_expired(self, connection: sqlite3.Connection, now: float):
+        connection.execute('DELETE FROM user_states WHERE expires_at < ?', (now,))
+        self._purged_at = time.monotonic()
+
+    def _write(self, user_id: int, payload: bytes) -> int:
+        connection = self._connect()
+        if time.monotonic() - self._purged_at > SQLITE_PURGE_INTERVAL:
+            # Пользователи, которые больше не пишут боту, иначе оставались бы в файле навсегда
+            self._purge_expired(connection, time.time())
+
+        return connection.execute(
+            'INSERT INTO user_states (user_id, version, expires_at, payload) VALUES (?, 1, ?, ?) '
+            'ON CONFLICT (user_id) DO UPDATE SET version = version + 1, '
+            'expires_at = excluded.expires_at, payload = excluded.payload '
+            'RETURNING version',
+            (user_id, time.time() + self._ttl, payload)
+        ).fetchone()[0]
+
+    def _write_if(self, user_id: int, payload: bytes, version: int) -> bool:
+        now = time.time()
+        cursor = self._connect().execute(
+            'UPDATE user_states SET version = version + 1, expires_at = ?, payload = ? '
+            'WHERE user_id = ? AND version = ? AND expires_at >= ?',
+            (now + self._ttl, payload, user_id, version, now)
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, user_id: int):
+        self._connect().execute('DELETE FROM user_states WHERE user_id = ?', (user_id,))
+
+    def size(self) -> int:
+        connection = self._connect()
+        self._purge_expired(connection, time.time())
+        return connection.execute('SELECT COUNT(*) FROM user_states').fetchone()[0]
+
+
+# Запись с проверкой версии одной атомарной операцией на сервере
+_REDIS_WRITE_IF = """
+if redis.call('HGET', KEYS[1], 'v') ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'v', ARGV[1] + 1, 'p', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+_REDIS_WRITE = """
+local version = redis.call('HINCRBY', KEYS[1], 'v', 1)
+redis.call('HSET', KEYS[1], 'p', ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return version
+"""
+
+
+class RedisStateStore(StateStore):
+    """Состояния на сервере с протоколом Redis, общем для всех процессов бота.
+
+    Состояние — хэш {v: версия, p: сериализованное состояние} с EXPIRE = ttl.
+    Требуется пакет redis (pip install redis).
+
+    Args:
+        url (str): Адрес сервера, например redis://localhost:6379/0
+        ttl (int): Секунд без изменений, после которых состояние удаляется
+        prefix (str): Префикс ключей состояний
+    """
+
+    def __init__(self, url: str, ttl: int, prefix: str):
+        if redis is None:
+            raise RuntimeError("Для STATE_BACKEND = 'redis' нужен пакет redis (pip install redis)")
+
+        self._redis = redis.Redis.from_url(url)
+        self._ttl = int(ttl)
+        self._prefix = prefix
+        self._write_script = self._redis.register_script(_REDIS_WRITE)
+        self._write_if_script = self._redis.register_script(_REDIS_WRITE_IF)
+
+    def _key(self, user_id: int) -> str:
+        return f'{self._prefix}{user_id}'
+
+    def _read(self, user_id: int) -> tuple[int, bytes] | None:
+        version, payload = self._redis.hmget(self._key(user_id), 'v', 'p')
+        if version is None or payload is None:
+            return None
+        return int(version), payload
+
+    def _write(self, user_id: int, payload: bytes) -> int:
+        return int(self._write_script(keys=[self._key(user_id)], args=[payload, self._ttl]))
+
+    def _write_if(self, user_id: int, payload: bytes, version: int) -> bool:
+        return bool(self._write_if_script(keys=[self._key(user_id)], args=[version, payload, self._ttl]))
+
+    def delete(self, user_id: int):
+        self._redis.delete(self._key(user_id))
+
+    def size(self) -> int:
+        # Истекшие ключи сервер удаляет сам, считаем оставшиеся по префиксу
+        return sum(1 for _ in self._redis.scan_iter(match=f'{self._prefix}*', count=1000))
+
+
+def create_state_store() -> StateStore:
+    """Создает хранилище состояний по settings.STATE_BACKEND.
+
+    Returns:
+        StateStore: Хранилище состояний
+    """
+    backend = settings.STATE_BACKEND
+    if backend == 'memory':
+        return MemoryStateStore(maxsize=settings.STATE_CACHE_SIZE, ttl=settings.STATE_TTL)
+    if backend == 'sqlite':
+        return SqliteStateStore(settings.STATE_SQLITE_PATH, ttl=settings.STATE_TTL)
+    if backend == 'redis':
+        return RedisStateStore(settings.STATE_REDIS_URL, ttl=settings.STATE_TTL, prefix=settings.STATE_REDIS_PREFIX)
+    raise ValueError(f'Неизвестный STATE_BACKEND: {backend}')
@@ -0,0 +1,190 @@
+# Пул обработчиков бота с порядком по чатам
+#
+# Стандартный пул TeleBot раздает обновления свободным потокам в любом порядке:
+# два быстрых нажатия одного пользователя могли обрабатываться одновременно.
+# Здесь у каждого чата своя очередь задач, и чат в каждый момент обрабатывает
+# не больше одного потока:
+#     - задачи одного чата выполняются строго по порядку поступления
+#     - разные чаты обрабатываются параллельно, медленный запрос к БД задерживает только свой чат
+#     - задач в очередях не больше max_pending: при переполнении поток polling ждет,
+#       и новые обновления остаются на стороне Telegram (обратное давление)
+#     - глубина очередей и число активных чатов печатаются раз в stats_interval секунд
+#       и в предупреждении о переполнении
+#
+# Интерфейс совпадает с telebot.util.ThreadPool (put, raise_exceptions, clear_exceptions,
+# close, exception_event), поэтому пул просто подставляется в bot.worker_pool.
+
+import threading
+from collections import deque
+from queue import Queue
+
+from sql_db.background import PeriodicTask
+
+# Сигнал остановки потока-обработчика
+_STOP = object()
+
+
+def chat_key(args: tuple):
+    """Ключ очереди для задачи TeleBot: id чата обновления (или пользователя).
+
+    Args:
+        args (tuple): Аргументы задачи, первый — Message, CallbackQuery и т.п.
+
+    Returns:
+        Ключ очереди или None, если обновление не относится к чату
+    """
+    if not args:
+        return None
+
+    update = args[0]
+    chat = getattr(update, 'chat', None) or getattr(getattr(update, 'message', None), 'chat', None)
+    if chat is not None:
+        return chat.id
+
+    user = getattr(update, 'from_user', None)
+    return user.id if user is not None else None
+
+
+class ChatOrderedPool:
+    """Пул потоков с очередью задач на каждый чат.
+
+    Args:
+        telebot (TeleBot): Бот (для его exception_handler)
+        num_threads (int): Количество потоков-обработчиков
+        max_pending (int): Максимум задач в очередях, после которого put() ждет
+        stats_interval (float): Интервал печати нагрузки в секундах (0 — не печатать)
+    """
+
+    def __init__(self, telebot, num_threads: int, max_pending: int, stats_interval: float = 0):
+        self.telebot = telebot
+        self.num_threads = num_threads
+        self._max_pending = max_pending
+
+        # Ключ чата → задачи чата. Чат остается в словаре, пока его задача выполняется,
+        # поэтому новые задачи встают в конец его очереди, а не в общую очередь
+        self._chats: dict = {}
+        # Чаты, у которых есть задачи и которые сейчас никто не обрабатывает
+        self._ready = Queue()
+        self._pending = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        # Очереди переполнялись и еще не разгрузились наполовину (предупреждение печатается один раз)
+        self._saturated = False
+
+        self.exception_event = threading.Event()
+        self.exception_info = None
+
+        self._workers = [
+            threading.Thread(target=self._run, name=f'BotWorker{i + 1}', daemon=True)
+            for i in range(num_threads)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+        self._stats_task = None
+        if stats_interval > 0:
+            self._stats_task = PeriodicTask('bot-worker-stats', stats_interval, self.log_load)
+            self._stats_task.start()
+
+    def put(self, func, *args, **kwargs) -> bool:
+        """Ставит задачу в очередь ее чата (ждет, если очереди переполнены).
+
+        Returns:
+            bool: True если задача поставлена, False если пул уже закрыт
+        """
+        key = chat_key(args)
+        if key is None:
+            # Обновление без чата ни с чем не упорядочивается
+            key = object()
+
+        with self._condition:
+            if self._pending >= self._max_pending and not self._closed:
+                if not self._saturated:
+                    self._saturated = True
+                    print(f'Очереди обработчиков заполнены ({self._pending} задач, '
+                          f'{len(self._chats)} чатов), прием обновлений приостановлен')
+                while self._pending >= self._max_pending and not self._closed:
+                    self._condition.wait()
+
+            if self._closed:
+                # Потоки-обработчики остановлены — задачу никто не выполнит
+                print(f'Пул обработчиков закрыт, задача {getattr(func, "__name__", func)} не принята')
+                return False
+
+            self._pending += 1
+            tasks = self._chats.get(key)
+            if tasks is None:
+                self._chats[key] = deque([(func, args, kwargs)])
+                self._ready.put(key)
+            else:
+                tasks.append((func, args, kwargs))
+        return True
+
+    def _run(self):
+        while True:
+            key = self._ready.get()
+            if key is _STOP:
+                break
+
+            with self._condition:
+                func, args, kwargs = self._chats[key].popleft()
+
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                self._on_exception(e)
+
+            with self._condition:
+                self._pending -= 1
+                self._condition.notify()
+                if self._saturated and self._pending <= self._max_pending // 2:
+                    self._saturated = False
+                if self._chats[key]:
+                    # У чата есть следующие задачи — в конец общей очереди, чтобы не задерживать другие чаты
+                    self._ready.put(key)
+                else:
+                    del self._chats[key]
+
+    def _on_exception(self, exception: Exception):
+        if self.telebot.exception_handler is not None:
+            handled = self.telebot.exception_handler.handle(exception)
+        else:
+            handled = False
+        if not handled:
+            self.exception_info = exception
+            self.exception_event.set()
+
+    def depth(self) -> int:
+        """Задач в очередях, включая выполняемые (метрика нагрузки)."""
+        return self._pending
+
+    def active_chats(self) -> int:
+        """Количество чатов с задачами в очереди или в работе."""
+        return len(self._chats)
+
+    def log_load(self):
+        """Печатает текущую нагрузку пула (глубину очередей и активные чаты)."""
+        print(f'Пул обработчиков: задач в очередях {self.depth()}/{self._max_pending}, '
+              f'активных чатов {self.active_chats()}')
+
+    def raise_exceptions(self):
+        if self.exception_event.is_set():
+            raise self.exception_info
+
+    def clear_exceptions(self):
+        self.exception_event.clear()
+
+    def close(self):
+        """Останавливает потоки-обработчики (как ThreadPool.close, очереди не дорабатываются до конца)."""
+        if self._stats_task is not None:
+            self._stats_task.stop()
+
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+        for _ in self._workers:
+            self._ready.put(_STOP)
+        for worker in self._workers:
+            if worker is not threading.current_thread():
+                worker.join()
@@ -11,6 +11,9 @@ class Settings:
 
     # Telegram Bot
     BOT_TOKEN: str = os.getenv('TELEGRAM_TOKEN', '')
+    BOT_WORKERS: int = int(os.getenv('BOT_WORKERS', '4'))  # Потоков-обработчиков обновлений
+    BOT_MAX_PENDING: int = int(os.getenv('BOT_MAX_PENDING', '1000'))  # Задач в очередях до паузы приема обновлений
+    BOT_STATS_INTERVAL: float = float(os.getenv('BOT_STATS_INTERVAL', '300'))  # Секунд между печатью нагрузки пула и размера хранилища состояний (0 — не печатать)
 
     # Database
     POSTGRES_HOST: str = os.getenv('POSTGRES_HOST', 'localhost')
@@ -23,6 +26,46 @@ class Settings:
     WORDS_PER_SESSION: int = 20  # Количество слов в цикле обучения
     STREAK_TO_MEMORIZE: int = 5  # Количество правильных ответов для запоминания
     RESET_DAYS: int = 5  # Дней неактивности для сброса прогресса
+    # Когда сбрасывать устаревший прогресс:
+    #     'session' — при старте каждой сессии обучения пользователя
+    #     'sweep'   — глобальной фоновой очисткой раз в STALE_SWEEP_INTERVAL секунд
+    #     'lazy'    — не сбрасывать в таблице, серия вычисляется при чтении по last_attempt_at
+    STALE_RESET_MODE: str = os.getenv('STALE_RESET_MODE', 'session')
+    STALE_SWEEP_INTERVAL: int = int(os.getenv('STALE_SWEEP_INTERVAL', '3600'))  # Секунд между глобальными очистками
+    STALE_SWEEP_BATCH: int = int(os.getenv('STALE_SWEEP_BATCH', '5000'))  # Строк за один UPDATE глобальной очистки
+    # Как хранить сессию обучения:
+    #     'list'   — список id слов сессии (личные слова, избранное, случайные из словаря)
+    #     'seeded' — только зерно, версия словаря и курсор; слова только из главного словаря
+    LEARNING_SESSION_MODE: str = os.getenv('LEARNING_SESSION_MODE', 'list')
+
+    # Cache settings
+    DICTIONARY_CACHE_TTL: int = int(os.getenv('DICTIONARY_CACHE_TTL', '600'))  # Секунд до перечитывания словаря из БД
+    DICTIONARY_SNAPSHOT_PATH: str = os.getenv('DICTIONARY_SNAPSHOT_PATH', 'data_words/dictionary.snapshot')  # Бинарный снапшот словаря
+    USER_CACHE_SIZE: int = int(os.getenv('USER_CACHE_SIZE', '10000'))  # Пользователей в кэше Telegram ID → id в БД
+    USER_CACHE_TTL: int = int(os.getenv('USER_CACHE_TTL', '3600'))  # Секунд жизни записи в кэше пользователей
+
+    # User states
+    # Где хранить состояния пользователей:
+    #     'memory' — в памяти процесса (один процесс бота)
+    #     'sqlite' — в файле STATE_SQLITE_PATH (несколько процессов на одной машине)
+    #     'redis'  — на сервере STATE_REDIS_URL (несколько машин, нужен пакет redis)
+    STATE_BACKEND: str = os.getenv('STATE_BACKEND', 'memory')
+    STATE_CACHE_SIZE: int = int(os.getenv('STATE_CACHE_SIZE', '10000'))  # Пользователей в хранилище состояний бота ('memory')
+    STATE_TTL: int = int(os.getenv('STATE_TTL', '3600'))  # Секунд простоя до удаления состояния (брошенная сессия)
+    SESSION_CHECKPOINT_INTERVAL: int = int(os.getenv('SESSION_CHECKPOINT_INTERVAL', '30'))  # Секунд между сохранениями сессий обучения в БД
+    STATE_SQLITE_PATH: str = os.getenv('STATE_SQLITE_PATH', 'bot_states.sqlite3')
+    STATE_REDIS_URL: str = os.getenv('STATE_REDIS_URL', 'redis://localhost:6379/0')
+    STATE_REDIS_PREFIX: str = os.getenv('STATE_REDIS_PREFIX', 'tgm:state:')
+
+    # Attempt history
+    ATTEMPT_JOURNAL_MODE: str = os.getenv('ATTEMPT_JOURNAL_MODE', 'async')  # 'async' — отложенная запись, 'sync' — сразу
+    ATTEMPT_FLUSH_ROWS: int = int(os.getenv('ATTEMPT_FLUSH_ROWS', '200'))  # Попыток в буфере до досрочной записи
+    ATTEMPT_FLUSH_INTERVAL_MS: int = int(os.getenv('ATTEMPT_FLUSH_INTERVAL_MS', '1000'))  # Интервал записи буфера
+    ATTEMPT_BUFFER_MAX_ROWS: int = int(os.getenv('ATTEMPT_BUFFER_MAX_ROWS', '100000'))  # Максимум попыток в буфере, пока БД недоступна
+
+    # Dictionary import
+    IMPORT_BATCH_SIZE: int = int(os.getenv('IMPORT_BATCH_SIZE', '5000'))  # Строк словаря в одной порции записи
+    IMPORT_PROGRESS_ROWS: int = int(os.getenv('IMPORT_PROGRESS_ROWS', '20000'))  # Строк между сообщениями о прогрессе
 
 
 settings = Settings()
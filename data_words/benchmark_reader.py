@@ -0,0 +1,69 @@
+import sys
+import time
+from typing import Callable, Generator, Iterable
+
+from words_pairs_parser import read_raw_dictionary
+
+
+def read_raw_dictionary_split(file_path: str,
+                              delimiter: str = "_____",
+                              buffer_size: int = 4096) -> Generator[str, None, None]:
+    """
+    Прежняя реализация read_raw_dictionary (для сравнения).
+    Каждый split копирует весь остаток буфера.
+    """
+    buffer = ""
+    with open(file_path, 'r', encoding='UTF-8') as f:
+        while True:
+            chunk = f.read(buffer_size)
+
+            if not chunk:
+                if (stripped := buffer.strip()):
+                    yield stripped
+                break
+
+            buffer += chunk
+
+            while delimiter in buffer:
+                part, buffer = buffer.split(delimiter, 1)
+                if (stripped := part.strip()):
+                    yield stripped
+
+
+def measure(reader: Callable[[str], Iterable[str]], file_path: str, repeat: int) -> tuple[float, list[str]]:
+    """
+    Прогоняет reader по файлу repeat раз.
+    Возвращает лучшее время в секундах и список записей последнего прогона.
+    """
+    best = float('inf')
+    entries = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        entries = list(reader(file_path))
+        best = min(best, time.perf_counter() - started)
+    return best, entries
+
+
+def benchmark_reader(file_path: str, repeat: int = 3):
+    """
+    Сравнивает скорость чтения словаря (МБ/с) прежней и новой реализацией
+    и проверяет, что обе возвращают одинаковые записи.
+    """
+    with open(file_path, 'rb') as f:
+        size_mb = len(f.read()) / (1024 * 1024)
+
+    results = {}
+    for name, reader in (('split (прежний)', read_raw_dictionary_split),
+                         ('find (текущий)', read_raw_dictionary)):
+        seconds, entries = measure(reader, file_path, repeat)
+        results[name] = entries
+        print(f"{name:<16} {seconds:8.3f} с  {size_mb / seconds:8.1f} МБ/с  записей: {len(entries)}")
+
+    same = len({tuple(entries) for entries in results.values()}) == 1
+    print("Записи совпадают" if same else "ВНИМАНИЕ: записи различаются")
+
+
+if __name__ == "__main__":
+    # python benchmark_reader.py [mueller-base.txt] [repeat]
+    benchmark_reader(sys.argv[1] if len(sys.argv) > 1 else "mueller-base.txt",
+                     int(sys.argv[2]) if len(sys.argv) > 2 else 3)
@@ -1,19 +1,49 @@
 import csv
+import os
 import re
-from typing import Generator
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Generator, Iterable
+
+
+# Регулярные выражения компилируются один раз при импорте модуля,
+# а не ищутся в кэше re при каждом вызове
+TRANSCRIPTION_RE = re.compile(r'\[([^\]]+)\]')
+TRANSCRIPTION_BLOCK_RE = re.compile(r'\[[^\]]+\]')
+PART_OF_SPEECH_RE = re.compile(r'^_[a-z]+\.?\s*')
+NUMBERED_RE = re.compile(r'(\d+\))\s*')
+LABEL_RE = re.compile(r'_[a-zа-яё]+\.?\s*')
+NESTED_NOTE_RE = re.compile(r'\*\)[^;,]*')
+REFERENCE_RE = re.compile(r'=\s*\w+')
+PARENTHESES_RE = re.compile(r'\([^)]*\)')
+BRACES_RE = re.compile(r'\{[^}]*\}')
+OPEN_BRACE_RE = re.compile(r'\{.*$')
+ENUMERATION_RE = re.compile(r'\d+\.\s*')
+SEPARATOR_RE = re.compile(r'[;,]\s+')
+QUOTES_RE = re.compile(r'["\'"«»]+')
+LEADING_PUNCTUATION_RE = re.compile(r'^[\s:,\-–—]+')
+TRAILING_PUNCTUATION_RE = re.compile(r'[\s:;\-–—]+$')
 
 
 def read_raw_dictionary(file_path: str,
                         delimiter: str = "_____",
-                        buffer_size: int = 4096) -> Generator[str, None, None]:
+                        buffer_size: int = 65536) -> Generator[str, None, None]:
     """
     Читает файл частями по разделителю.
     Возвращает генератор строк (записей словаря).
+
+    Разделители ищутся через str.find со сдвигающейся позиции, поэтому
+    прочитанный блок не копируется заново после каждой записи: в новый буфер
+    переносится только хвост после последнего разделителя. Если запись длиннее
+    буфера, следующее чтение не меньше накопленного хвоста — буфер растет
+    геометрически, и общее время остается линейным.
     """
     buffer = ""
+    step = len(delimiter)
     with open(file_path, 'r', encoding='UTF-8') as f:
         while True:
-            chunk = f.read(buffer_size)
+            chunk = f.read(max(buffer_size, len(buffer)))
 
             if not chunk:
                 if (stripped := buffer.strip()):
@@ -22,10 +52,13 @@ def read_raw_dictionary(file_path: str,
 
             buffer += chunk
 
-            while delimiter in buffer:
-                part, buffer = buffer.split(delimiter, 1)
-                if (stripped := part.strip()):
+            start = 0
+            while (end := buffer.find(delimiter, start)) != -1:
+                if (stripped := buffer[start:end].strip()):
                     yield stripped
+                start = end + step
+
+            buffer = buffer[start:]
 
 
 def parse_entry(entry: str) -> dict | None:
@@ -70,7 +103,7 @@ def parse_entry(entry: str) -> dict | None:
         return None
 
     # Извлекаем транскрипцию (первую найденную)
-    transcription_match = re.search(r'\[([^\]]+)\]', rest_text)
+    transcription_match = TRANSCRIPTION_RE.search(rest_text)
     transcription = f"[{transcription_match.group(1)}]" if transcription_match else ""
     # Убираем кавычки вокруг транскрипции (если есть)
     transcription = transcription.strip('"\'""')
@@ -98,16 +131,15 @@ def extract_translations(text: str) -> list[str]:
     translations = []
 
     # Удаляем транскрипцию
-    text = re.sub(r'\[[^\]]+\]', '', text)
+    text = TRANSCRIPTION_BLOCK_RE.sub('', text)
 
     # Удаляем метки частей речи в начале (_n., _v., _a., etc.)
-    text = re.sub(r'^_[a-z]+\.?\s*', '', text.strip())
+    text = PART_OF_SPEECH_RE.sub('', text.strip())
 
     # Проверяем наличие нумерованных переводов
-    numbered_pattern = r'(\d+\))\s*'
-    if re.search(numbered_pattern, text):
+    if NUMBERED_RE.search(text):
         # Разбиваем по номерам
-        parts = re.split(numbered_pattern, text)
+        parts = NUMBERED_RE.split(text)
 
         for i in range(1, len(parts), 2):
             if i + 1 < len(parts):
@@ -128,41 +160,41 @@ def clean_translation(text: str) -> list[str]:
     Возвращает список переводов (разбивает по ', ' и '; ').
     """
     # Удаляем все метки типа _амер., _библ., _греч. _миф. и т.д.
-    text = re.sub(r'_[a-zа-яё]+\.?\s*', '', text)
+    text = LABEL_RE.sub('', text)
 
     # Удаляем вложенные пояснения типа (*) ...
-    text = re.sub(r'\*\)[^;,]*', '', text)
+    text = NESTED_NOTE_RE.sub('', text)
 
     # Удаляем ссылки на другие слова (= something)
-    text = re.sub(r'=\s*\w+', '', text)
+    text = REFERENCE_RE.sub('', text)
 
     # Удаляем скобки с пояснениями типа (attr. ...), (употр. как ...)
-    text = re.sub(r'\([^)]*\)', '', text)
+    text = PARENTHESES_RE.sub('', text)
 
     # Удаляем фигурные скобки и их содержимое {ср. forty-niner}
-    text = re.sub(r'\{[^}]*\}', '', text)
+    text = BRACES_RE.sub('', text)
     # Удаляем незакрытые фигурные скобки до конца строки
-    text = re.sub(r'\{.*$', '', text)
+    text = OPEN_BRACE_RE.sub('', text)
 
     # Удаляем конструкции типа "1. ... 2. ..."
-    text = re.sub(r'\d+\.\s*', '', text)
+    text = ENUMERATION_RE.sub('', text)
 
     # Очищаем от лишних пробелов
     text = ' '.join(text.split())
 
     # Разбиваем по разделителям ", " и "; "
-    parts = re.split(r'[;,]\s+', text)
+    parts = SEPARATOR_RE.split(text)
 
     # Очищаем каждую часть и фильтруем пустые
     result = []
     for part in parts:
         cleaned = part.strip()
         # Удаляем все кавычки (внутри и снаружи)
-        cleaned = re.sub(r'["\'"«»]+', '', cleaned)
+        cleaned = QUOTES_RE.sub('', cleaned)
         # Удаляем знаки препинания в начале (:, -)
-        cleaned = re.sub(r'^[\s:,\-–—]+', '', cleaned)
+        cleaned = LEADING_PUNCTUATION_RE.sub('', cleaned)
         # Удаляем знаки препинания в конце
-        cleaned = re.sub(r'[\s:;\-–—]+$', '', cleaned)
+        cleaned = TRAILING_PUNCTUATION_RE.sub('', cleaned)
         # Пропускаем пустые и слишком короткие (1 символ)
         if cleaned and len(cleaned) > 1:
             result.append(cleaned)
@@ -170,10 +202,81 @@ def clean_translation(text: str) -> list[str]:
     return result
 
 
-def write_to_csv(input_file: str, output_file: str):
+def parse_pairs(entry: str) -> list[tuple[str, str, str]]:
+    """
+    Парсит одну запись словаря в пары слово-перевод.
+    Возвращает список (слово, транскрипция, перевод); слово и перевод в нижнем регистре.
+    """
+    parsed = parse_entry(entry)
+
+    if not parsed:
+        return []
+
+    word = parsed['word'].lower()
+    transcription = parsed['transcription']
+    return [(word, transcription, translation.lower()) for translation in parsed['translations']]
+
+
+def parse_chunk(entries: list[str]) -> list[tuple[str, str, str]]:
+    """
+    Парсит пачку записей (выполняется в процессе-воркере).
+    Возвращает пары в порядке записей.
+    """
+    pairs = []
+    for entry in entries:
+        pairs.extend(parse_pairs(entry))
+    return pairs
+
+
+def chunked(entries: Iterable[str], chunk_size: int) -> Generator[list[str], None, None]:
+    """
+    Разбивает поток записей на пачки по chunk_size штук.
+    """
+    chunk = []
+    for entry in entries:
+        chunk.append(entry)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_word_pairs(input_file: str,
+                    workers: int = 1,
+                    chunk_size: int = 500) -> Generator[tuple[str, str, str], None, None]:
+    """
+    Читает и парсит словарь, возвращает генератор пар (слово, транскрипция, перевод)
+    в порядке записей в файле.
+
+    При workers > 1 записи раздаются пачками по chunk_size процессам ProcessPoolExecutor.
+    В работе одновременно не больше 2 * workers пачек: файл не читается в память целиком,
+    а результаты отдаются строго в порядке пачек — порядок (и id строк) не зависит
+    от числа процессов.
+    """
+    entries = read_raw_dictionary(input_file)
+
+    if workers <= 1:
+        for entry in entries:
+            yield from parse_pairs(entry)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for chunk in chunked(entries, chunk_size):
+            in_flight.append(executor.submit(parse_chunk, chunk))
+            if len(in_flight) >= 2 * workers:
+                yield from in_flight.popleft().result()
+
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+
+def write_to_csv(input_file: str, output_file: str, workers: int = 1):
     """
     Обрабатывает словарь и записывает результат в CSV файл.
     Каждый перевод слова записывается отдельной строкой с уникальным id.
+    workers > 1 — парсинг в нескольких процессах (результат тот же, что и в одном).
     """
     word_id = 0
 
@@ -181,23 +284,14 @@ def write_to_csv(input_file: str, output_file: str):
         writer = csv.writer(csv_file)
         writer.writerow(["id", "word", "transcription", "translation"])
 
-        for entry in read_raw_dictionary(input_file):
-            parsed = parse_entry(entry)
-
-            if not parsed:
-                continue
-
-            word = parsed['word']
-            transcription = parsed['transcription']
-
-            for translation in parsed['translations']:
-                word_id += 1
-                row_id = f"id_{word_id:06d}"
-                # Приводим слово и перевод к нижнему регистру
-                writer.writerow([row_id, word.lower(), transcription, translation.lower()])
+        for word_id, (word, transcription, translation) in enumerate(iter_word_pairs(input_file, workers), start=1):
+            row_id = f"id_{word_id:06d}"
+            writer.writerow([row_id, word, transcription, translation])
 
     print(f"Записано {word_id} пар слово-перевод в {output_file}")
 
 
 if __name__ == "__main__":
-    write_to_csv("mueller-base.txt", "mueller_dictionary.csv")
+    # python words_pairs_parser.py [число процессов, по умолчанию — все ядра]
+    write_to_csv("mueller-base.txt", "mueller_dictionary.csv",
+                 workers=int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1)
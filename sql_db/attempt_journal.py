@@ -0,0 +1,209 @@
+# Журнал попыток с отложенной записью (write-behind)
+#
+# Каждая попытка в user_attempts — это только история для статистики,
+# ответ пользователю от нее не зависит. Поэтому попытки копятся в памяти
+# (только после коммита транзакции запроса — вместе с обновленными прогрессом и счетчиками)
+# и записываются в БД одним многострочным INSERT:
+#     - когда в буфере набралось settings.ATTEMPT_FLUSH_ROWS строк
+#     - раз в settings.ATTEMPT_FLUSH_INTERVAL_MS миллисекунд
+#     - при остановке бота (close)
+#
+# Режим settings.ATTEMPT_JOURNAL_MODE:
+#     'async' — отложенная запись (при аварийном падении процесса теряются попытки из буфера)
+#     'sync'  — попытка пишется в той же транзакции, что и прогресс (как раньше)
+#
+# Пока БД недоступна, попытки копятся в буфере, но не больше settings.ATTEMPT_BUFFER_MAX_ROWS:
+# сверх этого самые старые попытки отбрасываются с предупреждением.
+
+import atexit
+import threading
+from datetime import datetime
+
+from sqlalchemy import insert, event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from sql_db.background import PeriodicTask
+from sql_db.db_init import get_session
+from sql_db.models import UserAttempt
+from config.settings import settings
+
+
+# Ключ session.info с попытками, которые попадут в буфер после коммита сессии
+_PENDING_KEY = 'attempt_journal_rows'
+
+class AttemptJournal:
+    """Буфер попыток с пакетной записью в user_attempts.
+
+    Args:
+        mode (str): 'async' — отложенная запись, 'sync' — запись в текущей сессии
+        batch_size (int): Количество строк, после которого буфер сбрасывается досрочно
+        interval (float): Интервал фоновой записи в секундах
+        max_rows (int): Максимум попыток в буфере, самые старые сверх него отбрасываются
+    """
+
+    def __init__(self, mode: str, batch_size: int, interval: float, max_rows: int):
+        self._mode = mode
+        self._batch_size = batch_size
+        self._max_rows = max_rows
+        # Сколько попыток отброшено с последней удачной записи
+        self._dropped = 0
+        self._buffer: list[dict] = []
+        self._lock = threading.Lock()
+        # Сбрасывать буфер может только один поток за раз
+        self._flush_lock = threading.Lock()
+        self._task = PeriodicTask('attempt-journal', interval, self.flush)
+
+    def record(self, session: Session, user_id: int, translate_id: int,
+               is_correct: bool, attempted_at: datetime):
+        """Добавляет попытку в журнал.
+
+        Args:
+            session (Session): Сессия текущего запроса. В режиме 'async' попытка попадает
+                в буфер только после коммита этой сессии (при откате — не попадает)
+            user_id (int): id пользователя
+            translate_id (int): id пары слов
+            is_correct (bool): Правильный ли был ответ
+            attempted_at (datetime): Время попытки
+        """
+        row = {
+            'user_id': user_id,
+            'translate_id': translate_id,
+            'is_correct': is_correct,
+            'attempted_at': attempted_at
+        }
+
+        if self._mode == 'sync':
+            session.add(UserAttempt(**row))
+            return
+
+        rows = session.info.get(_PENDING_KEY)
+        if rows is None:
+            rows = session.info[_PENDING_KEY] = []
+            event.listen(session, 'after_commit', self._on_commit)
+            event.listen(session, 'after_rollback', self._on_rollback)
+        rows.append(row)
+
+    def _on_commit(self, session: Session):
+        rows = session.info[_PENDING_KEY]
+        if not rows:
+            return
+
+        with self._lock:
+            self._buffer.extend(rows)
+            self._trim()
+            pending = len(self._buffer)
+        rows.clear()
+
+        self._task.start()
+        if pending >= self._batch_size:
+            self._task.trigger()
+
+    def _on_rollback(self, session: Session):
+        # Прогресс и счетчики откатились — попытки в историю не пишем
+        session.info[_PENDING_KEY].clear()
+
+    def pending(self) -> int:
+        """Количество попыток, ожидающих записи."""
+        return len(self._buffer)
+
+    def flush(self) -> int:
+        """Записывает накопленные попытки в БД.
+
+        Returns:
+            int: Количество записанных попыток
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+
+            if not rows:
+                return 0
+
+            try:
+                with get_session() as session:
+                    session.execute(insert(UserAttempt), rows)
+                self._report_dropped()
+                return len(rows)
+            except IntegrityError:
+                # Слово или пользователь могли быть удалены, пока попытка ждала записи
+                return self._write_one_by_one(rows)
+            except Exception:
+                # БД недоступна — возвращаем строки в буфер до следующей попытки
+                with self._lock:
+                    self._buffer[:0] = rows
+                    self._trim()
+                raise
+
+    def _report_dropped(self):
+        """Печатает, сколько попыток потеряно, пока БД была недоступна."""
+        with self._lock:
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            print(f'Запись попыток восстановлена, отброшено попыток: {dropped}')
+
+    def _trim(self):
+        """Отбрасывает самые старые попытки сверх max_rows (вызывается под self._lock)."""
+        overflow = len(self._buffer) - self._max_rows
+        if overflow <= 0:
+            return
+
+        del self._buffer[:overflow]
+        if not self._dropped:
+            print(f'Буфер попыток переполнен ({self._max_rows}), самые старые попытки отбрасываются')
+        self._dropped += overflow
+
+    def discard_pair(self, translate_id: int) -> list[bool]:
+        """Убирает из буфера попытки пары слов, которая удаляется.
+
+        Ждет окончания идущей записи буфера: ее попытки уже будут в БД
+        и удалятся вместе с остальной историей пары.
+
+        Args:
+            translate_id (int): id пары слов
+
+        Returns:
+            list[bool]: is_correct убранных попыток
+        """
+        with self._flush_lock, self._lock:
+            discarded = [row['is_correct'] for row in self._buffer if row['translate_id'] == translate_id]
+            if discarded:
+                self._buffer = [row for row in self._buffer if row['translate_id'] != translate_id]
+        return discarded
+
+    def _write_one_by_one(self, rows: list[dict]) -> int:
+        written = 0
+        skipped = set()
+        try:
+            with get_session() as session:
+                for position, row in enumerate(rows):
+                    try:
+                        with session.begin_nested():
+                            session.execute(insert(UserAttempt), [row])
+                        written += 1
+                    except IntegrityError:
+                        skipped.add(position)
+                        print(f'Пропущена попытка для удаленной пары {row["translate_id"]}')
+        except Exception:
+            # Транзакция откатилась целиком — как и в flush, возвращаем строки в буфер
+            with self._lock:
+                self._buffer[:0] = [row for position, row in enumerate(rows) if position not in skipped]
+                self._trim()
+            raise
+        return written
+
+    def close(self):
+        """Останавливает фоновую запись и сбрасывает остаток буфера."""
+        self._task.stop()
+        self.flush()
+
+
+attempt_journal = AttemptJournal(
+    mode=settings.ATTEMPT_JOURNAL_MODE,
+    batch_size=settings.ATTEMPT_FLUSH_ROWS,
+    interval=settings.ATTEMPT_FLUSH_INTERVAL_MS / 1000,
+    max_rows=settings.ATTEMPT_BUFFER_MAX_ROWS
+)
+
+# Не теряем буфер при обычном завершении процесса
+atexit.register(attempt_journal.close)
@@ -0,0 +1,70 @@
+# Фоновые периодические задачи
+#
+# Простой поток-демон, который раз в interval секунд вызывает функцию.
+# Используется для сброса буферов в БД и обслуживающих запросов.
+
+import threading
+
+
+class PeriodicTask:
+    """Периодический вызов функции в отдельном потоке.
+
+    trigger() будит поток досрочно, stop() останавливает его
+    с последним вызовом функции (чтобы ничего не потерять при выключении).
+
+    Args:
+        name (str): Имя потока (видно в логах и отладчике)
+        interval (float): Интервал между вызовами в секундах
+        target (Callable): Вызываемая функция без аргументов
+    """
+
+    def __init__(self, name: str, interval: float, target):
+        self._name = name
+        self._interval = interval
+        self._target = target
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Запускает поток (повторный вызов ничего не делает)."""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+            self._thread.start()
+
+    def trigger(self):
+        """Просит выполнить задачу, не дожидаясь окончания интервала."""
+        self._wakeup.set()
+
+    def stop(self, timeout: float | None = None):
+        """Останавливает поток, выполнив задачу последний раз.
+
+        Args:
+            timeout (float | None): Сколько секунд ждать завершения потока
+        """
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+
+        self._stopped.set()
+        self._wakeup.set()
+        if thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self._interval)
+            self._wakeup.clear()
+            self._call()
+            if self._stopped.is_set():
+                break
+
+    def _call(self):
+        try:
+            self._target()
+        except Exception as e:
+            print(f'Ошибка фоновой задачи {self._name}: {e}')
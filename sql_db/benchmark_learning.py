@@ -0,0 +1,104 @@
+# Замер времени выбора слов для сессии обучения (get_words_for_learning)
+# в зависимости от числа выученных пользователем слов
+#
+# Пользователь и его прогресс создаются во временной транзакции, которая откатывается.
+# После заполнения прогресса выполняется ANALYZE: autovacuum не видит незакоммиченные строки,
+# и без свежей статистики планировщик считает прогресс пользователя пустым и выбирает
+# индекс (user_id, is_memorized) — замер показывает проход по всем выученным словам,
+# которого с актуальной статистикой в рабочей БД нет.
+#
+# Запуск:
+#     python -m sql_db.benchmark_learning [выучено ...]
+# Отрицательное число — выучено все, кроме стольких пар.
+
+import statistics
+import sys
+import time
+
+from sqlalchemy import select, insert, delete, func, text
+from sqlalchemy.orm import Session
+
+from sql_db.models import User, Translate, UserTranslationProgress
+from sql_db.sql_requests.learning import get_words_for_learning
+
+
+def memorize(session: Session, user_id: int, count: int):
+    """Отмечает выученными count случайных пар главного словаря.
+
+    Прежний прогресс пользователя удаляется.
+
+    Args:
+        session (Session): Сессия подключения к БД
+        user_id (int): id пользователя
+        count (int): Количество выученных пар
+    """
+    session.execute(delete(UserTranslationProgress).where(UserTranslationProgress.user_id == user_id))
+    if count:
+        pairs = select(Translate.id).where(Translate.owner_user.is_(None)).order_by(func.random()).limit(count)
+        session.execute(
+            insert(UserTranslationProgress).from_select(
+                ['user_id', 'translate_id', 'correct_streak', 'is_memorized', 'last_attempt_at'],
+                select(user_id, pairs.subquery().c.id, 0, True, func.now())
+            )
+        )
+    session.execute(text('ANALYZE user_translation_progress'))
+
+
+def measure(session: Session, user_id: int, repeat: int) -> tuple[float, int]:
+    """Вызывает get_words_for_learning repeat раз.
+
+    Args:
+        session (Session): Сессия подключения к БД
+        user_id (int): id пользователя
+        repeat (int): Количество вызовов
+
+    Returns:
+        tuple[float, int]: Медианное время в миллисекундах и минимальный размер сессии
+    """
+    timings = []
+    shortest = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        words = get_words_for_learning(session, user_id)
+        timings.append((time.perf_counter() - started) * 1000)
+        shortest = len(words) if shortest is None else min(shortest, len(words))
+    return statistics.median(timings), shortest
+
+
+def benchmark_learning(memorized_counts: list[int], repeat: int = 20):
+    """Замеряет время выбора слов и проверяет, что сессия не становится короче.
+
+    Args:
+        memorized_counts (list[int]): Количества выученных пар для замеров
+            (отрицательное — выучено все, кроме стольких пар)
+        repeat (int): Количество вызовов на каждый замер
+    """
+    from sql_db.db_init import engine
+
+    with engine.connect() as connection:
+        session = Session(bind=connection)
+
+        user = User(user_tg_nickname='benchmark_learning')
+        session.add(user)
+        session.flush()
+
+        total = session.execute(
+            select(func.count()).where(Translate.owner_user.is_(None))
+        ).scalar_one()
+        print(f'Пар в главном словаре: {total}')
+
+        for count in memorized_counts:
+            count = min(count if count >= 0 else total + count, total)
+            memorize(session, user.id, count)
+            median_ms, shortest = measure(session, user.id, repeat)
+            print(f'выучено {count:>7}  {median_ms:8.1f} мс  слов в сессии: {shortest}')
+
+        session.close()
+        connection.rollback()
+
+
+if __name__ == '__main__':
+    # По умолчанию последним проверяется пользователь, которому осталось выучить 10 пар
+    # (добор точным запросом по всему словарю, поэтому он заметно медленнее)
+    counts = [int(arg) for arg in sys.argv[1:]] or [0, 1000, 10000, 50000, -10]
+    benchmark_learning(counts)
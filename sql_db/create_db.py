@@ -1,109 +1,175 @@
 # Файл просто вормируем словарный запас в SQL
-
-from sqlalchemy import select, and_
+#
+# Основной путь — потоковый: записи из mueller-base.txt парсятся генератором
+# и сразу уходят порциями в БД, промежуточный CSV не нужен (его можно записать попутно).
+# Текст словаря целиком в памяти не держится: строки приходят из парсера пачками
+# и уходят в БД порциями по IMPORT_BATCH_SIZE. Но загрузчик (DictionaryLoader) на весь импорт
+# хранит индексы всего словаря: отпечатки и ключи прочитанных строк, id английских и русских
+# слов и множество существующих пар — память растет с размером словаря (десятки МБ для
+# словаря Мюллера). Весь импорт идет в одной транзакции.
+#
+# Запуск:
+#     python sql_db/create_db.py [--full] [--workers N] [--csv-out PATH]
+#     python sql_db/create_db.py --from-csv [PATH] [--full]
+
+import argparse
+import csv
+import time
+from typing import Generator, Iterable
 
 from sql_db.db_init import get_session, engine
-from sql_db.models import Base, WordEn, WordRu, Translate
+from sql_db.dictionary_loader import DictionaryLoader
+from sql_db.migrations import upgrade_schema
+from sql_db.snapshot import export_snapshot
+from data_words.words_pairs_parser import iter_word_pairs
+from config.settings import settings
 
-import csv
-from typing import Type, Optional, Union
-
-def check_and_write_word(session, 
-                         WordClass: Type, 
-                         word_in: str, 
-                         transcription: Optional[str] = None
-                         ) -> Union[int, None]:
-    """Функция получает данные для поиска дубликатов с таблице
-    если слово в словаре не найдено, то слово записывается в словарь
-    
-    В функцию передаем:
-        session - сессию подключения к БД
-        WordClass - класс, который определяет в какую таблицу будет записано слово
-        word_in: str - передем само слово en | ru
-        transcription: str|None - если есть транскрибация, то передаем
+
+def import_rows(rows: Iterable[tuple[str, str, str]], full: bool = False):
+    """Загружает поток пар в главный словарь и печатает прогресс.
+
+    Строки берутся из генератора по одной, поэтому источник читается
+    ровно с той скоростью, с какой загрузчик успевает писать в БД.
+
+    Args:
+        rows (Iterable[tuple[str, str, str]]): Пары (слово, транскрипция, перевод)
+        full (bool): Проверить по БД каждую строку, не доверяя сохраненным отпечаткам
+    """
+    started = time.perf_counter()
+
+    # открываем сессию
+    with get_session() as session:
+        loader = DictionaryLoader(session, incremental=not full)
+
+        for i, (word, transcription, translation) in enumerate(rows, start=1):
+            loader.add(word=word, transcription=transcription, translation=translation)
+
+            if i % settings.IMPORT_PROGRESS_ROWS == 0:
+                elapsed = time.perf_counter() - started
+                print(f'Обработано {i} строк, {i / elapsed:.0f} строк/с')
+
+        loader.close()
+
+    elapsed = time.perf_counter() - started
+    print(f'Импорт завершен за {elapsed:.1f} сек ({loader.rows / elapsed:.0f} строк/с)')
+
+
+def read_csv_rows(csv_path: str) -> Generator[tuple[str, str, str], None, None]:
+    """Читает пары из CSV словаря.
+
+    Args:
+        csv_path (str): Путь к CSV-файлу словаря
+
+    Returns:
+        Generator[tuple[str, str, str], None, None]: Пары (слово, транскрипция, перевод)
+    """
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader)  # пропускаем заголовок CSV
+
+        for line in reader:
+            # ['id_015236', 'believer', "[bI'li:vэ]", 'защитник'] - это структура строки
+            yield line[1], line[2], line[3]
+
+
+def tee_to_csv(rows: Iterable[tuple[str, str, str]],
+               csv_path: str) -> Generator[tuple[str, str, str], None, None]:
+    """Пропускает пары дальше и попутно пишет их в CSV (тот же формат, что у words_pairs_parser).
+
+    Args:
+        rows (Iterable[tuple[str, str, str]]): Пары (слово, транскрипция, перевод)
+        csv_path (str): Путь к создаваемому CSV-файлу
 
     Returns:
-        int | None: возвращается id слова из таблицы БД или None если слово добавить не удалось
+        Generator[tuple[str, str, str], None, None]: Те же пары
     """
-    # Ищем его в таблице, если слова нет, то вернется None
-    obj_word = session.execute(
-        select(WordClass).where(WordClass.word == word_in)
-    ).scalar_one_or_none()
+    with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'word', 'transcription', 'translation'])
 
-    # Пробуем вернуть id слова, если оно найдено
-    if obj_word:
-        return obj_word.id
+        for word_id, row in enumerate(rows, start=1):
+            writer.writerow([f'id_{word_id:06d}', *row])
+            yield row
 
-    # Если слово не найдено, то создаем объект
-    data = {"word": word_in}
-    if hasattr(WordClass, 'transcription') and transcription is not None:
-        data['transcription'] = transcription
 
-    obj_word = WordClass(**data)
-    session.add(obj_word)
-    session.flush() # получаем объект id
+def save_snapshot():
+    """Выгружает снапшот словаря после импорта.
 
-    return obj_word.id # Получаем и возвращаем id слова
+    Словарь к этому моменту уже в БД: если снапшот не записался,
+    бот при старте прочитает словарь из БД.
+    """
+    try:
+        export_snapshot()
+    except Exception as e:
+        print(f'Словарь загружен в БД, но снапшот не записан, ошибка: {e}')
+
+
+def create_init_data(csv_path: str = 'data_words/mueller_dictionary.csv', full: bool = False):
+    """Создает таблицы и загружает словарь из CSV в главный словарь.
+
+    По умолчанию импорт инкрементальный: в БД попадают только новые и измененные
+    строки по сравнению с прошлым импортом, в конце печатается отчет об изменениях.
+
+    Args:
+        csv_path (str): Путь к CSV-файлу словаря
+        full (bool): Проверить по БД каждую строку, не доверяя сохраненным отпечаткам
+    """
+    try:
+        print('Создаем таблицы базы данных')
+        upgrade_schema(engine)
+
+        import_rows(read_csv_rows(csv_path), full=full)
 
-def create_init_data():
+    except Exception as e:
+        print(f'Импорт не удался, ошибка: {e}')
+        return
+
+    # Снапшот для быстрого старта бота — уже с новой версией словаря
+    save_snapshot()
+
+
+def create_from_raw(raw_path: str = 'data_words/mueller-base.txt',
+                    csv_out: str | None = None,
+                    workers: int = 1,
+                    full: bool = False):
+    """Создает таблицы и загружает словарь прямо из исходного файла, без промежуточного CSV.
+
+    Args:
+        raw_path (str): Путь к исходному файлу словаря Мюллера
+        csv_out (str | None): Если указан — попутно записать CSV словаря по этому пути
+        workers (int): Количество процессов парсера
+        full (bool): Проверить по БД каждую строку, не доверяя сохраненным отпечаткам
+    """
     try:
         print('Создаем таблицы базы данных')
-        Base.metadata.create_all(bind=engine)
-
-        # открываем сессию
-        with get_session() as session:
-            # читаем по строкам csv файл
-            with open('data_words/mueller_dictionary.csv', 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                next(reader)  # пропускаем заголовок CSV
-
-                # Читаем файл по строкам чтобы экономить память
-                for i, line in enumerate(reader, start=1):
-                    # Берем каждую 100-ю строку, чтобы не перегружать словарь
-                    if i % 100 == 0:
-                        # ['id_015236', 'believer', "[bI'li:vэ]", 'защитник'] - это структура строки
-                        
-                        # Записываем en слово + transcription
-                        en_word_text = line[1].strip()
-                        en_transcription_text = line[2].strip()
-                        id_en_word = check_and_write_word(session=session,
-                                                          WordClass=WordEn,
-                                                          word_in=en_word_text,
-                                                          transcription=en_transcription_text)
-                        # Записываем ru слово
-                        ru_word_text = line[3].strip()
-                        id_ru_word = check_and_write_word(session=session,
-                                                          WordClass=WordRu,
-                                                          word_in=ru_word_text)
-
-                        # записываем в Translate связку id word_en, id word_ru
-                        # и создателя записи owner_user = NULL
-                        if id_en_word is not None and id_ru_word is not None:
-                            # Ищем совпадение пары, если такое совпадение есть, то пропускаем запись
-                            obj_translate = session.execute(select(Translate).where(
-                                    and_(
-                                        (Translate.word_e == id_en_word),
-                                        (Translate.word_r == id_ru_word)
-                                    )
-                                )
-                            ).scalar_one_or_none()
-
-                            if obj_translate is None:
-                                # Записываем слова в таблицу перевода
-                                # слова будут доступны всем, так как при записи владелец по умолчанию будет None
-                                data = {'word_e': id_en_word, 'word_r': id_ru_word}
-                                obj_translate = Translate(**data)
-                                session.add(obj_translate)
-                                session.flush() # получаем объект id
-                                id_translate = obj_translate.id # Получаем id пары перевода
-                            else:
-                                id_translate = obj_translate.id
-
-                            print(f'Записана пара {id_translate} в таблицу переводов')
-                            print(f'Слово {id_en_word}:{en_word_text}, перевод: {id_ru_word}:{ru_word_text}')
+        upgrade_schema(engine)
+
+        rows = iter_word_pairs(raw_path, workers=workers)
+        if csv_out:
+            rows = tee_to_csv(rows, csv_out)
+
+        import_rows(rows, full=full)
 
     except Exception as e:
         print(f'Импорт не удался, ошибка: {e}')
+        return
+
+    # Снапшот для быстрого старта бота — уже с новой версией словаря
+    save_snapshot()
+
 
 if __name__ == '__main__':
-    create_init_data()
+    parser = argparse.ArgumentParser(description='Загрузка словаря Мюллера в БД')
+    parser.add_argument('--full', action='store_true',
+                        help='проверить по БД каждую строку, не доверяя сохраненным отпечаткам')
+    parser.add_argument('--from-csv', nargs='?', const='data_words/mueller_dictionary.csv', metavar='PATH',
+                        help='загрузить из готового CSV вместо исходного файла')
+    parser.add_argument('--raw', default='data_words/mueller-base.txt', help='исходный файл словаря')
+    parser.add_argument('--csv-out', metavar='PATH', help='попутно записать CSV словаря')
+    parser.add_argument('--workers', type=int, default=1, help='количество процессов парсера')
+    args = parser.parse_args()
+
+    if args.from_csv:
+        create_init_data(args.from_csv, full=args.full)
+    else:
+        create_from_raw(args.raw, csv_out=args.csv_out, workers=args.workers, full=args.full)
@@ -24,6 +24,10 @@ DSN = URL.create(
 engine = create_engine(DSN, connect_args={'client_encoding':'utf8'}, echo=True)
 LocalSession = sessionmaker(engine)
 
+# Дочерний процесс (несколько воркеров бота) открывает свои соединения,
+# соединения родителя из пула не трогает
+os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
+
 # инициализируем доступ с закрытием сессии
 @contextmanager
 def get_session():
@@ -0,0 +1,342 @@
+# Кэш главного словаря в памяти процесса
+#
+# Вместо ORDER BY random() по всей таблице и чтения слов через ORM держим в памяти компактные массивы
+# главного словаря (DictionaryStore): текст пары по translate_id, id пар для случайной выборки
+# и английские слова для неправильных вариантов ответа.
+#
+# Словарь берется из снапшота (sql_db/snapshot.py), если его версия совпадает с версией
+# словаря в БД, иначе — запросом к БД. Снапшот отображается в память через mmap:
+# несколько процессов бота читают одни и те же страницы файла из кэша ОС без копий.
+# Словарь перечитывается после settings.DICTIONARY_CACHE_TTL секунд, после invalidate()
+# или не позже чем через секунду после подмены файла снапшота (create_db пишет его через os.replace).
+
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from array import array
+
+from sqlalchemy.orm import Session
+
+from sql_db.db_init import get_session
+from sql_db.snapshot import DictionarySnapshot, open_snapshot, read_dictionary_columns
+from sql_db.sql_requests.dictionary import get_dictionary_version
+from config.settings import settings
+
+
+class DictionaryPool(ABC):
+    """Базовый класс пула данных словаря с ленивой загрузкой и TTL."""
+
+    def __init__(self, ttl: int):
+        self._ttl = ttl
+        self._loaded_at: float | None = None
+        self._lock = threading.Lock()
+
+    def _is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self._ttl
+
+    @abstractmethod
+    def _load(self, session: Session):
+        """Загружает данные пула из БД (реализуется в наследниках)."""
+
+    def ensure_loaded(self, session: Session | None = None):
+        """Загружает пул, если он пустой или устарел.
+
+        Args:
+            session (Session | None): Сессия подключения к БД.
+                Если не передана, для загрузки открывается отдельная сессия.
+        """
+        if not self._is_stale():
+            return
+
+        with self._lock:
+            # Пока ждали блокировку, пул мог загрузить другой поток
+            if not self._is_stale():
+                return
+
+            if session is None:
+                with get_session() as own_session:
+                    self._load(own_session)
+            else:
+                self._load(session)
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        """Помечает пул устаревшим — при следующем обращении он перечитается из БД."""
+        self._loaded_at = None
+
+
+def _file_id(path: str) -> tuple[int, int] | None:
+    """Идентификатор версии файла (inode, время изменения) или None, если файла нет."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+class DictionaryData:
+    """Колонки одной загрузки главного словаря (неизменяемый набор).
+
+    Колонки — memoryview над снапшотом или массивы, прочитанные из БД.
+    DictionaryStore подменяет набор целиком одной ссылкой, поэтому читатель
+    никогда не видит колонки одной загрузки вперемешку с позициями другой.
+    """
+
+    __slots__ = ('version', 'translate_ids', 'pair_en', 'pair_ru', 'en_offsets',
+                 'transcription_offsets', 'ru_offsets', 'blob', 'position', 'snapshot', 'file_id')
+
+    def __init__(self, version: int, columns: list, blob,
+                 snapshot: DictionarySnapshot | None = None, file_id: tuple[int, int] | None = None):
+        self.version = version
+        (self.translate_ids, self.pair_en, self.pair_ru,
+         self.en_offsets, self.transcription_offsets, self.ru_offsets) = columns
+        self.blob = blob
+        # Ссылка держит отображение файла открытым, пока набор используется
+        self.snapshot = snapshot
+        self.file_id = file_id
+
+        # Плотный массив translate_id → позиция пары (-1 — пары нет)
+        translate_ids = self.translate_ids
+        self.position = array('i', [-1]) * ((translate_ids[-1] + 1) if len(translate_ids) else 0)
+        for index, translate_id in enumerate(translate_ids):
+            self.position[translate_id] = index
+
+    def index(self, translate_id: int) -> int:
+        if 0 <= translate_id < len(self.position):
+            return self.position[translate_id]
+        return -1
+
+    def text(self, offsets, index: int) -> str:
+        return str(self.blob[offsets[index]:offsets[index + 1]], 'utf-8')
+
+    def pair(self, translate_id: int) -> dict | None:
+        """Пара этой загрузки словаря по id.
+
+        Returns:
+            dict | None: {'translate_id', 'word_en', 'word_ru', 'transcription'} или None, если пары нет
+        """
+        index = self.index(translate_id)
+        if index < 0:
+            return None
+
+        en_index = self.pair_en[index]
+        return {
+            'translate_id': translate_id,
+            'word_en': self.text(self.en_offsets, en_index),
+            'word_ru': self.text(self.ru_offsets, self.pair_ru[index]),
+            'transcription': self.text(self.transcription_offsets, en_index) or None,
+        }
+
+    @property
+    def en_count(self) -> int:
+        return len(self.en_offsets) - 1
+
+
+EMPTY_DATA = DictionaryData(0, [array('i'), array('i'), array('i'),
+                                array('i', [0]), array('i', [0]), array('i', [0])], b'')
+
+
+# Не чаще раза в столько секунд проверять, не подменен ли файл снапшота
+SNAPSHOT_CHECK_INTERVAL = 1.0
+
+
+class DictionaryStore(DictionaryPool):
+    """Главный словарь в колонках только для чтения.
+
+    Пары хранятся массивами int32, все слова — одним блоком UTF-8 с границами,
+    каждое слово один раз (как в снапшоте). Строка декодируется только при обращении.
+    Поиск по translate_id — O(1) через плотный массив translate_id → позиция.
+
+    Args:
+        ttl (int): Секунд до перечитывания словаря
+        snapshot_path (str): Путь к файлу снапшота
+    """
+
+    def __init__(self, ttl: int, snapshot_path: str = settings.DICTIONARY_SNAPSHOT_PATH):
+        super().__init__(ttl)
+        self._snapshot_path = snapshot_path
+        self._data = EMPTY_DATA
+        # Когда файл снапшота последний раз проверялся и совпадал с загруженным
+        self._checked_at = float('-inf')
+
+    def _is_stale(self) -> bool:
+        if super()._is_stale():
+            return True
+
+        # Проверка файла — один stat не чаще раза в SNAPSHOT_CHECK_INTERVAL секунд:
+        # новый снапшот подхватывается через секунду, а не через TTL
+        now = time.monotonic()
+        if now - self._checked_at < SNAPSHOT_CHECK_INTERVAL:
+            return False
+        if _file_id(self._snapshot_path) != self._data.file_id:
+            return True
+        self._checked_at = now
+        return False
+
+    def _load(self, session: Session):
+        # Запоминаем файл до открытия: если его подменят во время загрузки,
+        # следующая проверка увидит изменение и загрузит словарь еще раз
+        file_id = _file_id(self._snapshot_path)
+        version = get_dictionary_version(session)
+        snapshot = open_snapshot(self._snapshot_path, expected_version=version)
+
+        if snapshot is not None:
+            # Колонки остаются memoryview над файлом — данные не копируются
+            columns = [snapshot.translate_ids, snapshot.pair_en, snapshot.pair_ru,
+                       snapshot.en_offsets, snapshot.transcription_offsets, snapshot.ru_offsets]
+            data = DictionaryData(version, columns, snapshot.blob, snapshot=snapshot, file_id=file_id)
+        else:
+            version, columns, blob = read_dictionary_columns(session)
+            data = DictionaryData(version, columns, blob, file_id=file_id)
+
+        # Подмена одной ссылкой; старый набор (и его mmap) освободится,
+        # когда его перестанут использовать читатели
+        self._data = data
+
+    def data(self, session: Session | None = None) -> DictionaryData:
+        """Возвращает текущий набор колонок, при необходимости загрузив словарь.
+
+        Args:
+            session (Session | None): Сессия БД, используется только для загрузки
+
+        Returns:
+            DictionaryData: Набор колонок (не меняется, даже если словарь перезагрузят)
+        """
+        self.ensure_loaded(session)
+        return self._data
+
+    @property
+    def version(self) -> int:
+        return self._data.version
+
+    def __len__(self) -> int:
+        return len(self._data.translate_ids)
+
+    def __contains__(self, translate_id: int) -> bool:
+        return self._data.index(translate_id) >= 0
+
+    def get(self, translate_id: int, session: Session | None = None) -> dict | None:
+        """Возвращает пару главного словаря по id.
+
+        Args:
+            translate_id (int): id пары из translate
+            session (Session | None): Сессия БД, используется только для загрузки
+
+        Returns:
+            dict | None: {'translate_id', 'word_en', 'word_ru', 'transcription'}
+                или None, если пары нет в главном словаре (личная пара или словарь устарел)
+        """
+        return self.data(session).pair(translate_id)
+
+
+class GlobalPairPool:
+    """Случайная выборка id пар главного словаря (owner_user = NULL).
+
+    Своих данных не хранит — выбирает из колонки translate_ids DictionaryStore.
+
+    Args:
+        store (DictionaryStore): Главный словарь
+    """
+
+    def __init__(self, store: DictionaryStore):
+        self._store = store
+
+    def sample(self, session: Session, count: int, exclude: set[int] | frozenset[int] = frozenset()) -> list[int]:
+        """Выбирает случайные id пар главного словаря.
+
+        Args:
+            session (Session): Сессия подключения к БД (нужна только для загрузки пула)
+            count (int): Сколько id нужно выбрать
+            exclude (set[int]): id пар, которые нельзя выбирать (выученные, уже взятые)
+
+        Returns:
+            list[int]: Список уникальных id (может быть меньше count, если слов не хватает)
+        """
+        if count <= 0:
+            return []
+
+        # Берем локальную ссылку: перезагрузка словаря в другом потоке не помешает выборке
+        ids = self._store.data(session).translate_ids
+        size = len(ids)
+        if size == 0:
+            return []
+
+        picked = []
+        seen = set()
+
+        # Случайные попытки: пока исключений мало, почти каждая попытка удачная
+        for _ in range(count * 8):
+            translate_id = ids[random.randrange(size)]
+            if translate_id in exclude or translate_id in seen:
+                continue
+            seen.add(translate_id)
+            picked.append(translate_id)
+            if len(picked) == count:
+                return picked
+
+        # Исключения покрывают большую часть словаря — добираем полным перебором
+        rest = [translate_id for translate_id in ids if translate_id not in exclude and translate_id not in seen]
+        picked.extend(random.sample(rest, min(count - len(picked), len(rest))))
+        return picked
+
+
+class DistractorPool:
+    """Английские слова главного словаря для неправильных вариантов ответа.
+
+    Своих данных не хранит — декодирует случайные слова из блока строк DictionaryStore.
+
+    Args:
+        store (DictionaryStore): Главный словарь
+    """
+
+    def __init__(self, store: DictionaryStore):
+        self._store = store
+
+    def sample(self, count: int, exclude_word: str | None = None,
+               session: Session | None = None, rng: random.Random | None = None) -> list[str]:
+        """Выбирает случайные английские слова без обращения к БД.
+
+        Args:
+            count (int): Количество слов
+            exclude_word (str | None): Слово, которое нельзя выбирать (правильный ответ)
+            session (Session | None): Сессия БД, используется только для первой загрузки словаря
+            rng (random.Random | None): Генератор случайных чисел; с одним и тем же зерном
+                и той же версией словаря выбор повторяется
+
+        Returns:
+            list[str]: Список уникальных слов (может быть меньше count, если слов не хватает)
+        """
+        if count <= 0:
+            return []
+
+        rng = rng or random
+        data = self._store.data(session)
+        size = data.en_count
+        if size == 0:
+            return []
+
+        picked = []
+        seen = {exclude_word}
+
+        for _ in range(count * 8):
+            word = data.text(data.en_offsets, rng.randrange(size))
+            if word in seen:
+                continue
+            seen.add(word)
+            picked.append(word)
+            if len(picked) == count:
+                return picked
+
+        # Словарь почти пустой — добираем полным перебором
+        rest = [data.text(data.en_offsets, index) for index in range(size)]
+        rest = sorted({word for word in rest if word not in seen})
+        picked.extend(rng.sample(rest, min(count - len(picked), len(rest))))
+        return picked
+
+
+# Общие пулы процесса
+dictionary_store = DictionaryStore(ttl=settings.DICTIONARY_CACHE_TTL)
+global_pairs = GlobalPairPool(dictionary_store)
+distractor_pool = DistractorPool(dictionary_store)
@@ -0,0 +1,242 @@
+# Пакетная загрузка главного словаря в БД
+#
+# Вместо SELECT + flush на каждое слово и каждую пару:
+#     - слова дедуплицируются в памяти (словари слово → id)
+#     - новые слова пишутся многострочным INSERT ... ON CONFLICT DO NOTHING
+#     - id новых слов получаются одним SELECT ... WHERE word IN (...) на порцию
+#     - новые пары пишутся многострочным INSERT
+# На одну порцию из settings.IMPORT_BATCH_SIZE строк уходит не больше пяти запросов.
+#
+# Инкрементальный режим (по умолчанию): для каждой строки CSV хранится отпечаток
+# в таблице dictionary_fingerprint. Строки с неизменным отпечатком пропускаются
+# без обращения к БД, в порции попадают только новые и измененные строки.
+# Строки, исчезнувшие из CSV, только попадают в отчет — пары из словаря не удаляются,
+# на них может ссылаться прогресс и избранное пользователей.
+
+import hashlib
+
+from sqlalchemy import select, update, bindparam
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from sql_db.models import WordEn, WordRu, Translate, DictionaryFingerprint
+from sql_db.sql_requests.dictionary import bump_dictionary_version
+from config.settings import settings
+
+
+# Ограничения длины колонок — строки с более длинными словами пропускаются
+MAX_EN_WORD = WordEn.__table__.c.word.type.length
+MAX_TRANSCRIPTION = WordEn.__table__.c.transcription.type.length
+MAX_RU_WORD = WordRu.__table__.c.word.type.length
+
+
+def _hash64(*parts: str) -> int:
+    """Стабильный между запусками 64-битный хэш строк (в диапазоне BIGINT)."""
+    digest = hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def row_fingerprint(word: str, transcription: str, translation: str) -> tuple[int, int]:
+    """Считает ключ пары и отпечаток строки словаря.
+
+    Args:
+        word (str): Английское слово
+        transcription (str): Транскрипция
+        translation (str): Русский перевод
+
+    Returns:
+        tuple[int, int]: (pair_key — хэш слова и перевода, fingerprint — хэш всей строки)
+    """
+    return _hash64(word, translation), _hash64(word, transcription, translation)
+
+
+class DictionaryLoader:
+    """Пакетный загрузчик пар слово-перевод в главный словарь (owner_user = NULL).
+
+    Строки копятся в порции и записываются в БД через flush().
+    Повторная загрузка тех же строк ничего не дублирует.
+
+    Args:
+        session (Session): Сессия подключения к БД
+        batch_size (int): Количество строк в одной порции
+        incremental (bool): Пропускать строки, отпечаток которых не изменился.
+            False — полная проверка каждой строки по БД (отпечатки при этом обновляются)
+    """
+
+    def __init__(self, session: Session, batch_size: int = settings.IMPORT_BATCH_SIZE,
+                 incremental: bool = True):
+        self._session = session
+        self._batch_size = batch_size
+        self._incremental = incremental
+        self._batch: list[tuple[str, str, str]] = []
+
+        # Отпечатки из прошлых импортов: pair_key → fingerprint (загружаются при первой строке)
+        self._fingerprints: dict[int, int] | None = None
+        # Ключи пар, встреченные в текущем импорте
+        self._seen: set[int] = set()
+        # Отпечатки и новые транскрипции текущей порции для записи в flush()
+        self._new_fingerprints: dict[int, int] = {}
+        self._transcriptions: dict[str, str] = {}
+
+        # Уже известные id слов: слово → id
+        self._en_ids: dict[str, int] = {}
+        self._ru_ids: dict[str, int] = {}
+        # Пары главного словаря (word_e, word_r), которые уже есть в БД.
+        # UNIQUE (word_e, word_r, owner_user) не срабатывает при owner_user = NULL,
+        # поэтому дубликаты отсекаем сами
+        self._pairs: set[tuple[int, int]] | None = None
+
+        # Счетчики для итогового отчета
+        self.rows = 0
+        self.skipped = 0
+        self.words_added = 0
+        self.pairs_added = 0
+        # Разница с прошлым импортом
+        self.added = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.removed = 0
+
+    def add(self, word: str, transcription: str, translation: str):
+        """Добавляет строку словаря в текущую порцию.
+
+        Args:
+            word (str): Английское слово
+            transcription (str): Транскрипция
+            translation (str): Русский перевод
+        """
+        self.rows += 1
+        word, transcription, translation = word.strip(), transcription.strip(), translation.strip()
+
+        if (not word or not translation or len(word) > MAX_EN_WORD
+                or len(transcription) > MAX_TRANSCRIPTION or len(translation) > MAX_RU_WORD):
+            self.skipped += 1
+            return
+
+        if self._fingerprints is None:
+            self._fingerprints = dict(self._session.execute(
+                select(DictionaryFingerprint.pair_key, DictionaryFingerprint.fingerprint)
+            ).tuples().all())
+
+        pair_key, fingerprint = row_fingerprint(word, transcription, translation)
+
+        # Повтор пары в том же файле — берется первая строка, как и для транскрипции
+        if pair_key in self._seen:
+            return
+        self._seen.add(pair_key)
+
+        stored = self._fingerprints.get(pair_key)
+        if stored == fingerprint:
+            self.unchanged += 1
+            if self._incremental:
+                return
+        else:
+            if stored is None:
+                self.added += 1
+            else:
+                self.changed += 1
+                self._transcriptions[word] = transcription
+            self._new_fingerprints[pair_key] = fingerprint
+
+        self._batch.append((word, transcription, translation))
+        if len(self._batch) >= self._batch_size:
+            self.flush()
+
+    def flush(self):
+        """Записывает накопленную порцию в БД."""
+        if not self._batch:
+            return
+
+        batch, self._batch = self._batch, []
+
+        if self._pairs is None:
+            self._pairs = set(self._session.execute(
+                select(Translate.word_e, Translate.word_r).where(Translate.owner_user.is_(None))
+            ).tuples())
+
+        # Для повторяющегося английского слова берем первую транскрипцию
+        new_en: dict[str, str] = {}
+        new_ru: set[str] = set()
+        for word, transcription, translation in batch:
+            if word not in self._en_ids and word not in new_en:
+                new_en[word] = transcription
+            if translation not in self._ru_ids:
+                new_ru.add(translation)
+
+        self.words_added += self._insert_words(
+            WordEn, self._en_ids, [{'word': word, 'transcription': tr} for word, tr in new_en.items()]
+        )
+        self.words_added += self._insert_words(
+            WordRu, self._ru_ids, [{'word': word} for word in new_ru]
+        )
+
+        new_pairs = []
+        for word, _, translation in batch:
+            pair = (self._en_ids[word], self._ru_ids[translation])
+            if pair not in self._pairs:
+                self._pairs.add(pair)
+                new_pairs.append({'word_e': pair[0], 'word_r': pair[1]})
+
+        if new_pairs:
+            self._session.execute(pg_insert(Translate).values(new_pairs).on_conflict_do_nothing())
+            self.pairs_added += len(new_pairs)
+
+        # Пара та же, изменилась транскрипция — обновляем ее у английского слова
+        if self._transcriptions:
+            table = WordEn.__table__
+            self._session.execute(
+                update(table).where(table.c.word == bindparam('b_word')).values(transcription=bindparam('b_transcription')),
+                [{'b_word': word, 'b_transcription': tr} for word, tr in self._transcriptions.items()],
+            )
+            self._transcriptions = {}
+
+        if self._new_fingerprints:
+            stmt = pg_insert(DictionaryFingerprint).values(
+                [{'pair_key': key, 'fingerprint': fp} for key, fp in self._new_fingerprints.items()]
+            )
+            self._session.execute(stmt.on_conflict_do_update(
+                index_elements=['pair_key'], set_={'fingerprint': stmt.excluded.fingerprint}
+            ))
+            self._new_fingerprints = {}
+
+    def _insert_words(self, WordClass: type, known_ids: dict[str, int], rows: list[dict]) -> int:
+        """Вставляет новые слова и дописывает их id в known_ids.
+
+        Args:
+            WordClass (type): WordEn или WordRu
+            known_ids (dict[str, int]): Словарь слово → id, который нужно пополнить
+            rows (list[dict]): Строки для вставки
+
+        Returns:
+            int: Количество действительно вставленных слов
+        """
+        if not rows:
+            return 0
+
+        inserted = self._session.execute(
+            pg_insert(WordClass).values(rows).on_conflict_do_nothing(index_elements=['word'])
+        ).rowcount
+
+        # Одним запросом получаем id и только что вставленных, и уже существовавших слов
+        words = [row['word'] for row in rows]
+        known_ids.update(self._session.execute(
+            select(WordClass.word, WordClass.id).where(WordClass.word.in_(words))
+        ).tuples().all())
+        return inserted
+
+    def close(self):
+        """Записывает остаток порции и печатает итоговый отчет."""
+        self.flush()
+
+        if self._fingerprints is not None:
+            self.removed = len(self._fingerprints.keys() - self._seen)
+
+        # Словарь изменился — снапшоты прежней версии становятся устаревшими
+        if self.pairs_added or self.changed:
+            version = bump_dictionary_version(self._session)
+            print(f'Версия словаря: {version}')
+
+        print(f'Обработано строк: {self.rows}, пропущено: {self.skipped}, '
+              f'новых слов: {self.words_added}, новых пар: {self.pairs_added}')
+        print(f'Изменения словаря: добавлено {self.added}, изменено {self.changed}, '
+              f'без изменений {self.unchanged}, нет в файле {self.removed}')
@@ -0,0 +1,73 @@
+# Потокобезопасный LRU-кэш с временем жизни записей
+#
+# Используется для небольших справочников в памяти процесса
+# (например, соответствие Telegram ID → id пользователя в БД).
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """LRU-кэш с ограничением количества записей и TTL.
+
+    Args:
+        maxsize (int): Максимальное количество записей, самые старые вытесняются
+        ttl (float): Время жизни записи в секундах
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Возвращает значение по ключу или default, если записи нет или она устарела."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Сохраняет значение и вытесняет самые давние записи при переполнении."""
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self._ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Удаляет запись и возвращает ее значение."""
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[0]
+
+    def purge_expired(self) -> int:
+        """Удаляет все устаревшие записи.
+
+        Returns:
+            int: Количество удаленных записей
+        """
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, (_, expires_at) in self._data.items() if expires_at < now]
+            for key in expired:
+                del self._data[key]
+        return len(expired)
+
+    def clear(self):
+        """Очищает кэш."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
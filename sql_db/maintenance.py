@@ -0,0 +1,39 @@
+# Обслуживающие фоновые задачи БД
+
+from sql_db.background import PeriodicTask
+from sql_db.db_init import get_session
+from sql_db.sql_requests.learning import reset_stale_progress_batch
+from config.settings import settings
+
+
+def sweep_stale_progress() -> int:
+    """Сбрасывает устаревший прогресс всех пользователей порциями.
+
+    Каждая порция — один UPDATE в своей транзакции.
+
+    Returns:
+        int: Общее количество сброшенных записей прогресса
+    """
+    total = 0
+    while True:
+        with get_session() as session:
+            reset_count = reset_stale_progress_batch(session, settings.STALE_SWEEP_BATCH)
+
+        total += reset_count
+        if reset_count < settings.STALE_SWEEP_BATCH:
+            break
+
+    if total > 0:
+        print(f'Глобальная очистка: сброшен прогресс для {total} слов')
+    return total
+
+
+stale_progress_sweeper = PeriodicTask('stale-progress-sweep', settings.STALE_SWEEP_INTERVAL, sweep_stale_progress)
+
+
+def start_maintenance():
+    """Запускает фоновые задачи, включенные в настройках."""
+    if settings.STALE_RESET_MODE == 'sweep':
+        stale_progress_sweeper.start()
+        # Первая очистка сразу после запуска, дальше — по интервалу
+        stale_progress_sweeper.trigger()
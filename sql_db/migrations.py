@@ -0,0 +1,59 @@
+# Обновление схемы уже существующей базы данных
+#
+# Base.metadata.create_all создает только отсутствующие таблицы и не трогает
+# существующие: новые колонки и индексы в них не появятся.
+# Здесь собраны идемпотентные шаги, которые догоняют старую схему до текущих моделей.
+# Каждый шаг можно выполнять повторно.
+#
+# Запуск вручную:
+#     python sql_db/migrations.py
+# Планы горячих запросов проверяет tests/test_index_usage.py.
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from sql_db.models import Base
+
+
+MIGRATIONS = [
+    # Telegram ID пользователя (ключ поиска вместо никнейма)
+    'ALTER TABLE user_tg ADD COLUMN IF NOT EXISTS tg_id BIGINT',
+    'CREATE UNIQUE INDEX IF NOT EXISTS ix_user_tg_tg_id ON user_tg (tg_id)',
+
+    # Индексы горячих запросов по пользователю
+    'CREATE INDEX IF NOT EXISTS ix_translate_owner_user ON translate (owner_user)',
+    'CREATE INDEX IF NOT EXISTS ix_user_progress_user_memorized_last '
+    'ON user_translation_progress (user_id, is_memorized, last_attempt_at)',
+    'CREATE INDEX IF NOT EXISTS ix_user_attempts_user_correct ON user_attempts (user_id, is_correct)',
+
+    # Строки счетчиков статистики для пользователей, зарегистрированных до их появления
+    # (считаются только пользователи без строки — повторный запуск не читает историю попыток)
+    'INSERT INTO user_stats (user_id, total_attempts, correct_attempts, user_words_count, favorites_count) '
+    'SELECT u.id, '
+    '(SELECT count(*) FROM user_attempts a WHERE a.user_id = u.id), '
+    '(SELECT count(*) FROM user_attempts a WHERE a.user_id = u.id AND a.is_correct), '
+    '(SELECT count(*) FROM translate t WHERE t.owner_user = u.id), '
+    '(SELECT count(*) FROM user_favorite f WHERE f.user_id = u.id) '
+    'FROM user_tg u WHERE NOT EXISTS (SELECT 1 FROM user_stats s WHERE s.user_id = u.id) '
+    'ON CONFLICT (user_id) DO NOTHING',
+]
+
+
+def upgrade_schema(engine: Engine):
+    """Создает недостающие таблицы и применяет шаги миграции.
+
+    Args:
+        engine (Engine): Подключение к БД
+    """
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as connection:
+        for statement in MIGRATIONS:
+            connection.execute(text(statement))
+
+
+if __name__ == '__main__':
+    from sql_db.db_init import engine
+
+    upgrade_schema(engine)
+    print('Схема БД обновлена')
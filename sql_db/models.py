@@ -2,7 +2,7 @@
 
 from datetime import datetime
 
-from sqlalchemy import String, ForeignKey, UniqueConstraint, DateTime
+from sqlalchemy import String, ForeignKey, UniqueConstraint, DateTime, BigInteger, Index, LargeBinary
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 class Base(DeclarativeBase):
@@ -14,6 +14,9 @@ class User(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_tg_nickname: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
+    # Числовой Telegram ID — не меняется, в отличие от никнейма
+    # NULL только у пользователей, зарегистрированных до появления колонки (заполняется при первом обращении)
+    tg_id: Mapped[int | None] = mapped_column(BigInteger, unique=True, index=True, nullable=True)
 
     translation: Mapped[list['Translate']] = relationship('Translate', back_populates='owner')
 
@@ -42,6 +45,8 @@ class Translate(Base):
     __tablename__ = 'translate'
     __table_args__ = (
         UniqueConstraint('word_e', 'word_r', 'owner_user', name='uq_word_pair_owner'),
+        # Личные слова пользователя и счетчик user_words_count
+        Index('ix_translate_owner_user', 'owner_user'),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -59,6 +64,8 @@ class Translate(Base):
 # (только для пар с owner_user = NULL)
 class UserFavorite(Base):
     __tablename__ = 'user_favorite'
+    # Индекс уникального ограничения (user_id, translate_id) обслуживает и выборки по user_id,
+    # поэтому отдельный индекс по user_id не нужен
     __table_args__ = (
         UniqueConstraint('user_id', 'translate_id', name='uq_user_favorite'),
     )
@@ -84,6 +91,8 @@ class UserTranslationProgress(Base):
     __tablename__ = 'user_translation_progress'
     __table_args__ = (
         UniqueConstraint('user_id', 'translate_id', name='uq_user_translate'),
+        # Статистика (выучено / в процессе) и сброс устаревшего прогресса
+        Index('ix_user_progress_user_memorized_last', 'user_id', 'is_memorized', 'last_attempt_at'),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -104,6 +113,10 @@ class UserTranslationProgress(Base):
 # Таблица учёта попыток перевода (история ответов)
 class UserAttempt(Base):
     __tablename__ = 'user_attempts'
+    __table_args__ = (
+        # Подсчет попыток пользователя (всего / правильных)
+        Index('ix_user_attempts_user_correct', 'user_id', 'is_correct'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey('user_tg.id'), nullable=False)
@@ -115,3 +128,53 @@ class UserAttempt(Base):
 
     user: Mapped['User'] = relationship('User')
     translate: Mapped['Translate'] = relationship('Translate')
+
+
+# Счетчики статистики пользователя
+# Поддерживаются инкрементально (record_attempt, избранное, добавление/удаление слов),
+# чтобы экран статистики не пересчитывал всю историю попыток.
+# Строка создается при первом открытии статистики по данным основных таблиц.
+class UserStats(Base):
+    __tablename__ = 'user_stats'
+
+    user_id: Mapped[int] = mapped_column(ForeignKey('user_tg.id'), primary_key=True)
+    total_attempts: Mapped[int] = mapped_column(default=0, nullable=False)
+    correct_attempts: Mapped[int] = mapped_column(default=0, nullable=False)
+    user_words_count: Mapped[int] = mapped_column(default=0, nullable=False)
+    favorites_count: Mapped[int] = mapped_column(default=0, nullable=False)
+
+    user: Mapped['User'] = relationship('User')
+
+
+# Отпечатки строк CSV главного словаря для инкрементального импорта
+# pair_key — хэш (слово, перевод), fingerprint — хэш (слово, транскрипция, перевод).
+# Строки с тем же отпечатком при повторном импорте пропускаются без обращения к словарю,
+# строки с тем же pair_key, но другим отпечатком считаются измененными.
+class DictionaryFingerprint(Base):
+    __tablename__ = 'dictionary_fingerprint'
+
+    pair_key: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    fingerprint: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+# Версия главного словаря — увеличивается при каждом импорте, который изменил словарь.
+# По ней снапшот словаря (sql_db/snapshot.py) понимает, что устарел.
+# В таблице одна строка с id = 1.
+class DictionaryVersion(Base):
+    __tablename__ = 'dictionary_version'
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# Сохраненные сессии обучения — чекпоинт состояний бота в режиме обучения.
+# Пишется периодически и при остановке бота, после перезапуска сессия
+# восстанавливается при первом нажатии кнопки квиза.
+# payload — состояние в формате bot/states/state_codec.py (десятки-сотни байт).
+class SavedLearningSession(Base):
+    __tablename__ = 'learning_session'
+
+    tg_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    payload: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True, nullable=False)
@@ -0,0 +1,250 @@
+# Бинарный снапшот главного словаря
+#
+# Вместо чтения word_en / word_ru / translate через ORM при каждом старте процесса
+# главный словарь выгружается в один файл, который открывается через mmap за миллисекунды.
+#
+# Формат файла (порядок байт little-endian):
+#     заголовок HEADER:
+#         magic (8 байт), версия формата, версия словаря (dictionary_version),
+#         количество пар, английских слов, русских слов, размер блока строк
+#     массивы int32:
+#         translate_ids[pairs]          — id пар главного словаря по возрастанию
+#         pair_en[pairs]                — номер английского слова пары
+#         pair_ru[pairs]                — номер русского слова пары
+#         en_offsets[en + 1]            — границы английских слов в блоке строк
+#         transcription_offsets[en + 1] — границы транскрипций
+#         ru_offsets[ru + 1]            — границы русских слов
+#     блок строк UTF-8 (все слова и транскрипции подряд)
+#
+# Запуск вручную (выгрузить снапшот из БД):
+#     python sql_db/snapshot.py [путь]
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from sql_db.db_init import get_session
+from sql_db.models import Translate, WordEn, WordRu
+from sql_db.sql_requests.dictionary import get_dictionary_version
+from config.settings import settings
+
+
+MAGIC = b'TGMDICT\x00'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<8sIqIIII')
+# Массивы int32 в порядке их записи в файл
+COLUMNS = ('translate_ids', 'pair_en', 'pair_ru', 'en_offsets', 'transcription_offsets', 'ru_offsets')
+
+
+def _append_strings(blob: bytearray, strings: list[str]) -> array:
+    """Дописывает строки в блок UTF-8 и возвращает массив их границ."""
+    offsets = array('i', [len(blob)])
+    for text in strings:
+        blob += text.encode('utf-8')
+        offsets.append(len(blob))
+    return offsets
+
+
+def read_dictionary_columns(session: Session) -> tuple[int, list[array], bytes]:
+    """Читает главный словарь из БД в колонки формата снапшота.
+
+    Args:
+        session (Session): Сессия подключения к БД
+
+    Returns:
+        tuple[int, list[array], bytes]: Версия словаря, массивы int32 (в порядке COLUMNS)
+            и блок строк UTF-8
+    """
+    version = get_dictionary_version(session)
+
+    stmt = (
+        select(Translate.id, WordEn.id, WordEn.word, WordEn.transcription, WordRu.id, WordRu.word)
+        .join(WordEn, Translate.word_e == WordEn.id)
+        .join(WordRu, Translate.word_r == WordRu.id)
+        .where(Translate.owner_user.is_(None))
+        .order_by(Translate.id)
+    )
+
+    translate_ids, pair_en, pair_ru = array('i'), array('i'), array('i')
+    # id слова в БД → номер слова в снапшоте (каждое слово хранится один раз)
+    en_index: dict[int, int] = {}
+    ru_index: dict[int, int] = {}
+    en_words, transcriptions, ru_words = [], [], []
+
+    for translate_id, en_id, en_word, transcription, ru_id, ru_word in session.execute(stmt):
+        if en_id not in en_index:
+            en_index[en_id] = len(en_words)
+            en_words.append(en_word)
+            transcriptions.append(transcription or '')
+        if ru_id not in ru_index:
+            ru_index[ru_id] = len(ru_words)
+            ru_words.append(ru_word)
+
+        translate_ids.append(translate_id)
+        pair_en.append(en_index[en_id])
+        pair_ru.append(ru_index[ru_id])
+
+    blob = bytearray()
+    columns = [
+        translate_ids, pair_en, pair_ru,
+        _append_strings(blob, en_words),
+        _append_strings(blob, transcriptions),
+        _append_strings(blob, ru_words),
+    ]
+    return version, columns, bytes(blob)
+
+
+def write_snapshot(session: Session, path: str = settings.DICTIONARY_SNAPSHOT_PATH) -> int:
+    """Выгружает главный словарь в файл снапшота.
+
+    Файл пишется во временный и подменяется через os.replace, поэтому читатели
+    видят либо старый, либо новый снапшот целиком.
+
+    Args:
+        session (Session): Сессия подключения к БД
+        path (str): Путь к файлу снапшота
+
+    Returns:
+        int: Количество пар в снапшоте
+    """
+    version, columns, blob = read_dictionary_columns(session)
+    translate_ids, en_offsets, ru_offsets = columns[0], columns[3], columns[5]
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, version,
+                            len(translate_ids), len(en_offsets) - 1, len(ru_offsets) - 1, len(blob)))
+        for column in columns:
+            if sys.byteorder != 'little':
+                column.byteswap()
+            f.write(column.tobytes())
+        f.write(blob)
+    os.replace(tmp_path, path)
+
+    print(f'Снапшот словаря версии {version}: {len(translate_ids)} пар, '
+          f'{os.path.getsize(path) / (1024 * 1024):.1f} МБ → {path}')
+    return len(translate_ids)
+
+
+class DictionarySnapshot:
+    """Снапшот главного словаря, открытый через mmap (только чтение).
+
+    Массивы — memoryview над отображенным файлом, данные не копируются.
+    Номера слов (pair_en, pair_ru) — позиции в таблицах слов снапшота, а не id в БД.
+
+    Args:
+        path (str): Путь к файлу снапшота
+    """
+
+    __slots__ = ('path', 'version', 'translate_ids', 'pair_en', 'pair_ru',
+                 'en_offsets', 'transcription_offsets', 'ru_offsets', 'blob', '_mmap', '_views')
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, format_version, self.version, pairs, en_count, ru_count, blob_size = \
+                HEADER.unpack_from(self._mmap)
+            if magic != MAGIC or format_version != FORMAT_VERSION:
+                raise ValueError(f'неизвестный формат снапшота {path}')
+
+            view = memoryview(self._mmap)
+            self._views = [view]
+            position = HEADER.size
+
+            def take_ints(count: int) -> memoryview:
+                nonlocal position
+                part = view[position:position + 4 * count].cast('i')
+                self._views.append(part)
+                position += 4 * count
+                return part
+
+            self.translate_ids = take_ints(pairs)
+            self.pair_en = take_ints(pairs)
+            self.pair_ru = take_ints(pairs)
+            self.en_offsets = take_ints(en_count + 1)
+            self.transcription_offsets = take_ints(en_count + 1)
+            self.ru_offsets = take_ints(ru_count + 1)
+            self.blob = view[position:position + blob_size]
+            self._views.append(self.blob)
+
+            if position + blob_size != len(self._mmap):
+                raise ValueError(f'поврежденный снапшот {path}')
+        except Exception:
+            self.close()
+            raise
+
+    def __len__(self) -> int:
+        return len(self.translate_ids)
+
+    def _text(self, offsets: memoryview, index: int) -> str:
+        return str(self.blob[offsets[index]:offsets[index + 1]], 'utf-8')
+
+    def en_word(self, index: int) -> str:
+        """Английское слово по номеру в снапшоте."""
+        return self._text(self.en_offsets, index)
+
+    def transcription(self, index: int) -> str:
+        """Транскрипция английского слова по номеру в снапшоте."""
+        return self._text(self.transcription_offsets, index)
+
+    def ru_word(self, index: int) -> str:
+        """Русское слово по номеру в снапшоте."""
+        return self._text(self.ru_offsets, index)
+
+    def close(self):
+        """Освобождает отображение файла."""
+        for view in reversed(getattr(self, '_views', [])):
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+
+def open_snapshot(path: str = settings.DICTIONARY_SNAPSHOT_PATH,
+                  expected_version: int | None = None) -> DictionarySnapshot | None:
+    """Открывает снапшот словаря, если он есть и не устарел.
+
+    Args:
+        path (str): Путь к файлу снапшота
+        expected_version (int | None): Текущая версия словаря в БД.
+            Если версия снапшота другая, снапшот считается устаревшим
+
+    Returns:
+        DictionarySnapshot | None: Открытый снапшот или None (нет файла, устарел, поврежден)
+    """
+    if not os.path.exists(path):
+        return None
+
+    try:
+        snapshot = DictionarySnapshot(path)
+    except (OSError, ValueError, struct.error) as e:
+        print(f'Снапшот словаря не прочитан: {e}')
+        return None
+
+    if expected_version is not None and snapshot.version != expected_version:
+        print(f'Снапшот словаря устарел: версия {snapshot.version}, в БД {expected_version}')
+        snapshot.close()
+        return None
+
+    return snapshot
+
+
+def export_snapshot(path: str = settings.DICTIONARY_SNAPSHOT_PATH):
+    """Выгружает снапшот главного словаря в отдельной сессии.
+
+    Args:
+        path (str): Путь к файлу снапшота
+    """
+    with get_session() as session:
+        write_snapshot(session, path)
+
+
+if __name__ == '__main__':
+    export_snapshot(sys.argv[1] if len(sys.argv) > 1 else settings.DICTIONARY_SNAPSHOT_PATH)
@@ -0,0 +1,41 @@
+# Версия главного словаря (таблица dictionary_version)
+
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from sql_db.models import DictionaryVersion
+
+
+def get_dictionary_version(session: Session) -> int:
+    """Возвращает текущую версию главного словаря.
+
+    Args:
+        session (Session): Сессия подключения к БД
+
+    Returns:
+        int: Версия словаря (0, если словарь еще ни разу не импортировался)
+    """
+    version = session.execute(
+        select(DictionaryVersion.version).where(DictionaryVersion.id == 1)
+    ).scalar_one_or_none()
+    return version or 0
+
+
+def bump_dictionary_version(session: Session) -> int:
+    """Увеличивает версию главного словаря на 1.
+
+    Args:
+        session (Session): Сессия подключения к БД
+
+    Returns:
+        int: Новая версия словаря
+    """
+    stmt = pg_insert(DictionaryVersion).values(id=1, version=1, updated_at=datetime.utcnow())
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['id'],
+        set_={'version': DictionaryVersion.version + 1, 'updated_at': stmt.excluded.updated_at},
+    ).returning(DictionaryVersion.version)
+    return session.execute(stmt).scalar_one()
@@ -10,16 +10,23 @@
 #     - Показывать графики прогресса
 
 from datetime import datetime, timedelta
-from sqlalchemy import select, and_, func
+from sqlalchemy import select, update, exists, and_, or_, func, case, literal, true
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
-from sql_db.models import (
-    Translate, WordEn, WordRu,
-    UserTranslationProgress, UserAttempt, UserFavorite
-)
+from sql_db.models import Translate, UserTranslationProgress, UserFavorite, UserStats
+from sql_db.attempt_journal import attempt_journal
+from sql_db.dictionary_cache import global_pairs
+from sql_db.sql_requests.user_stats import COUNTER_FIELDS, bump_user_stats_stmt, create_user_counters
+from sql_db.sql_requests.words import select_word_pairs, word_pair_to_dict, get_global_pairs
 from config.settings import settings
 
 
+# Сколько раз добирать случайные слова, если кандидаты оказались выученными
+# (если и после этого слов не хватает, они добираются точным запросом)
+RANDOM_SAMPLE_ROUNDS = 4
+
+
 def get_or_create_progress(session: Session, user_id: int, translate_id: int) -> UserTranslationProgress:
     """Получает или создает запись прогресса для пары слов.
 
@@ -52,6 +59,48 @@ def get_or_create_progress(session: Session, user_id: int, translate_id: int) ->
     return progress
 
 
+def stale_threshold() -> datetime:
+    """Момент, раньше которого последняя попытка считается устаревшей (settings.RESET_DAYS)."""
+    return datetime.utcnow() - timedelta(days=settings.RESET_DAYS)
+
+
+def stale_progress_condition():
+    """Условие устаревшего прогресса: слово не выучено, серия > 0
+    и последняя попытка была раньше settings.RESET_DAYS дней назад.
+
+    Returns:
+        ColumnElement: Условие для WHERE по UserTranslationProgress
+    """
+    return and_(
+        UserTranslationProgress.is_memorized == False,
+        UserTranslationProgress.last_attempt_at < stale_threshold(),
+        UserTranslationProgress.correct_streak > 0
+    )
+
+
+def effective_streak():
+    """Серия правильных ответов с учетом правила сброса, вычисленная при чтении.
+
+    Для невыученного слова без попыток дольше settings.RESET_DAYS дней
+    возвращает 0, даже если в таблице серия еще не сброшена.
+    Благодаря этому в режиме settings.STALE_RESET_MODE = 'lazy'
+    устаревшие строки вообще не нужно переписывать.
+
+    Returns:
+        ColumnElement: SQL-выражение для серии
+    """
+    return case(
+        (
+            and_(
+                UserTranslationProgress.is_memorized == False,
+                UserTranslationProgress.last_attempt_at < stale_threshold()
+            ),
+            0
+        ),
+        else_=UserTranslationProgress.correct_streak
+    )
+
+
 def check_and_reset_stale_progress(session: Session, user_id: int) -> int:
     """Сбрасывает прогресс для слов с неактивностью более 5 дней.
 
@@ -65,31 +114,121 @@ def check_and_reset_stale_progress(session: Session, user_id: int) -> int:
     Returns:
         int: Количество сброшенных записей прогресса
     """
-    reset_threshold = datetime.utcnow() - timedelta(days=settings.RESET_DAYS)
-
-    # Находим все записи с устаревшим прогрессом
-    stmt = select(UserTranslationProgress).where(
+    # Один UPDATE по всем устаревшим записям вместо загрузки строк в Python
+    stmt = update(UserTranslationProgress).where(
         and_(
             UserTranslationProgress.user_id == user_id,
-            UserTranslationProgress.is_memorized == False,
-            UserTranslationProgress.last_attempt_at < reset_threshold,
-            UserTranslationProgress.correct_streak > 0
+            stale_progress_condition()
         )
-    )
-    stale_progress = session.execute(stmt).scalars().all()
+    ).values(correct_streak=0).execution_options(synchronize_session=False)
 
-    reset_count = 0
-    for progress in stale_progress:
-        progress.correct_streak = 0
-        reset_count += 1
+    reset_count = session.execute(stmt).rowcount
 
     if reset_count > 0:
-        session.flush()
         print(f'Сброшен прогресс для {reset_count} слов')
 
     return reset_count
 
 
+def reset_stale_progress_batch(session: Session, batch_size: int) -> int:
+    """Сбрасывает устаревший прогресс всех пользователей (одна порция).
+
+    Используется глобальной фоновой очисткой (settings.STALE_RESET_MODE = 'sweep'),
+    которая вызывает функцию, пока она не вернет 0.
+    Порции ограничивают размер транзакции и время блокировки строк.
+
+    Args:
+        session (Session): Сессия подключения к БД
+        batch_size (int): Максимальное количество строк за один UPDATE
+
+    Returns:
+        int: Количество сброшенных записей прогресса
+    """
+    batch_ids = select(UserTranslationProgress.id).where(
+        stale_progress_condition()
+    ).limit(batch_size).scalar_subquery()
+
+    stmt = update(UserTranslationProgress).where(
+        UserTranslationProgress.id.in_(batch_ids)
+    ).values(correct_streak=0).execution_options(synchronize_session=False)
+
+    return session.execute(stmt).rowcount
+
+
+def upsert_progress(session: Session, user_id: int, translate_id: int,
+                    is_correct: bool, attempted_at: datetime, also_execute: list | None = None) -> dict:
+    """Обновляет прогресс слова после ответа одним запросом к БД.
+
+    INSERT ... ON CONFLICT (user_id, translate_id) DO UPDATE ... RETURNING:
+    новая серия и флаг выученности считаются в SQL, поэтому нет отдельного
+    SELECT и нет гонки на uq_user_translate между потоками бота.
+    Прежнее значение is_memorized читается в CTE (снимок до обновления).
+
+    Args:
+        session (Session): Сессия подключения к БД
+        user_id (int): id пользователя
+        translate_id (int): id пары слов
+        is_correct (bool): Правильный ли был ответ
+        attempted_at (datetime): Время попытки
+        also_execute (list | None): Дополнительные INSERT/UPDATE, которые нужно выполнить
+            в том же запросе (добавляются как CTE)
+
+    Returns:
+        dict: {'correct_streak': int, 'is_memorized': bool, 'was_memorized': bool}
+    """
+    progress = UserTranslationProgress.__table__
+
+    previous = select(progress.c.is_memorized).where(
+        and_(
+            progress.c.user_id == user_id,
+            progress.c.translate_id == translate_id
+        )
+    ).cte('previous')
+
+    insert_stmt = pg_insert(progress).values(
+        user_id=user_id,
+        translate_id=translate_id,
+        correct_streak=1 if is_correct else 0,
+        is_memorized=is_correct and settings.STREAK_TO_MEMORIZE <= 1,
+        last_attempt_at=attempted_at
+    )
+
+    if is_correct:
+        # Устаревшая серия считается нулевой, даже если ее еще не сбросили в таблице
+        new_streak = effective_streak() + 1
+        new_memorized = or_(progress.c.is_memorized, new_streak >= settings.STREAK_TO_MEMORIZE)
+    else:
+        # Неправильный ответ сбрасывает серию, выученность не меняется
+        new_streak = literal(0)
+        new_memorized = progress.c.is_memorized
+
+    upserted = insert_stmt.on_conflict_do_update(
+        constraint='uq_user_translate',
+        set_={
+            'correct_streak': new_streak,
+            'is_memorized': new_memorized,
+            'last_attempt_at': insert_stmt.excluded.last_attempt_at
+        }
+    ).returning(progress.c.correct_streak, progress.c.is_memorized).cte('upserted')
+
+    stmt = select(
+        upserted.c.correct_streak,
+        upserted.c.is_memorized,
+        func.coalesce(previous.c.is_memorized, False).label('was_memorized')
+    ).select_from(upserted.outerjoin(previous, true()))
+
+    if also_execute:
+        stmt = stmt.add_cte(*(extra.cte() for extra in also_execute))
+
+    row = session.execute(stmt).one()
+
+    return {
+        'correct_streak': row.correct_streak,
+        'is_memorized': row.is_memorized,
+        'was_memorized': row.was_memorized
+    }
+
+
 def record_attempt(session: Session, user_id: int, translate_id: int, is_correct: bool) -> dict:
     """Записывает попытку перевода и обновляет прогресс.
 
@@ -106,37 +245,23 @@ def record_attempt(session: Session, user_id: int, translate_id: int, is_correct
             'just_memorized': bool  # True если слово только что выучено
         }
     """
-    # Записываем попытку в историю
-    attempt = UserAttempt(
-        user_id=user_id,
-        translate_id=translate_id,
-        is_correct=is_correct,
-        attempted_at=datetime.utcnow()
-    )
-    session.add(attempt)
+    attempted_at = datetime.utcnow()
 
-    # Обновляем прогресс
-    progress = get_or_create_progress(session, user_id, translate_id)
-    progress.last_attempt_at = datetime.utcnow()
+    # Записываем попытку в историю (в режиме 'async' — отложенно, пакетом)
+    attempt_journal.record(session, user_id, translate_id, is_correct, attempted_at)
 
-    just_memorized = False
+    # Обновляем прогресс и счетчики статистики одним запросом
+    stats_update = bump_user_stats_stmt(user_id, total_attempts=1, correct_attempts=int(is_correct))
+    progress = upsert_progress(session, user_id, translate_id, is_correct, attempted_at,
+                               also_execute=[stats_update])
 
-    if is_correct:
-        progress.correct_streak += 1
-        # Проверяем, достигнут ли порог запоминания
-        if progress.correct_streak >= settings.STREAK_TO_MEMORIZE and not progress.is_memorized:
-            progress.is_memorized = True
-            just_memorized = True
-            print(f'Слово {translate_id} выучено!')
-    else:
-        # Сбрасываем streak при неправильном ответе
-        progress.correct_streak = 0
-
-    session.flush()
+    just_memorized = progress['is_memorized'] and not progress['was_memorized']
+    if just_memorized:
+        print(f'Слово {translate_id} выучено!')
 
     return {
-        'correct_streak': progress.correct_streak,
-        'is_memorized': progress.is_memorized,
+        'correct_streak': progress['correct_streak'],
+        'is_memorized': progress['is_memorized'],
         'just_memorized': just_memorized
     }
 
@@ -144,6 +269,10 @@ def record_attempt(session: Session, user_id: int, translate_id: int, is_correct
 def get_user_stats(session: Session, user_id: int) -> dict:
     """Получает статистику обучения пользователя.
 
+    Счетчики попыток, личных и избранных слов берутся из user_stats (O(1), не зависит
+    от длины истории), выученные слова и слова в процессе считаются одним агрегатом
+    с FILTER по прогрессу пользователя — все одним запросом.
+
     Args:
         session (Session): Сессия подключения к БД
         user_id (int): id пользователя
@@ -151,45 +280,38 @@ def get_user_stats(session: Session, user_id: int) -> dict:
     Returns:
         dict: Статистика пользователя
     """
-    # Общее количество попыток
-    total_attempts = session.query(func.count(UserAttempt.id)).filter(
-        UserAttempt.user_id == user_id
-    ).scalar() or 0
-
-    # Количество правильных ответов
-    correct_attempts = session.query(func.count(UserAttempt.id)).filter(
-        and_(
-            UserAttempt.user_id == user_id,
-            UserAttempt.is_correct == True
-        )
-    ).scalar() or 0
-
-    # Количество выученных слов
-    memorized_count = session.query(func.count(UserTranslationProgress.id)).filter(
-        and_(
-            UserTranslationProgress.user_id == user_id,
-            UserTranslationProgress.is_memorized == True
-        )
-    ).scalar() or 0
-
-    # Количество слов в процессе изучения (streak > 0, но не выучено)
-    in_progress_count = session.query(func.count(UserTranslationProgress.id)).filter(
-        and_(
-            UserTranslationProgress.user_id == user_id,
-            UserTranslationProgress.is_memorized == False,
-            UserTranslationProgress.correct_streak > 0
-        )
-    ).scalar() or 0
-
-    # Количество личных слов пользователя
-    user_words_count = session.query(func.count(Translate.id)).filter(
-        Translate.owner_user == user_id
-    ).scalar() or 0
+    progress = select(
+        # Количество выученных слов
+        func.count().filter(UserTranslationProgress.is_memorized == True).label('memorized_count'),
+        # Количество слов в процессе изучения (streak > 0, но не выучено)
+        func.count().filter(
+            and_(
+                UserTranslationProgress.is_memorized == False,
+                effective_streak() > 0
+            )
+        ).label('in_progress_count')
+    ).where(UserTranslationProgress.user_id == user_id).subquery()
+
+    stmt = select(
+        progress.c.memorized_count,
+        progress.c.in_progress_count,
+        UserStats.user_id,
+        UserStats.total_attempts,
+        UserStats.correct_attempts,
+        UserStats.user_words_count,
+        UserStats.favorites_count
+    ).select_from(progress.outerjoin(UserStats, UserStats.user_id == user_id))
+
+    row = session.execute(stmt).one()
+
+    if row.user_id is None:
+        # Первое открытие статистики — считаем счетчики по основным таблицам
+        counters = create_user_counters(session, user_id)
+    else:
+        counters = {name: getattr(row, name) for name in COUNTER_FIELDS}
 
-    # Количество избранных слов
-    favorites_count = session.query(func.count(UserFavorite.id)).filter(
-        UserFavorite.user_id == user_id
-    ).scalar() or 0
+    total_attempts = counters['total_attempts']
+    correct_attempts = counters['correct_attempts']
 
     # Процент правильных ответов
     accuracy = (correct_attempts / total_attempts * 100) if total_attempts > 0 else 0
@@ -198,10 +320,10 @@ def get_user_stats(session: Session, user_id: int) -> dict:
         'total_attempts': total_attempts,
         'correct_attempts': correct_attempts,
         'accuracy': round(accuracy, 1),
-        'memorized_count': memorized_count,
-        'in_progress_count': in_progress_count,
-        'user_words_count': user_words_count,
-        'favorites_count': favorites_count
+        'memorized_count': row.memorized_count,
+        'in_progress_count': row.in_progress_count,
+        'user_words_count': counters['user_words_count'],
+        'favorites_count': counters['favorites_count']
     }
 
 
@@ -211,7 +333,8 @@ def get_words_for_learning(session: Session, user_id: int, limit: int = None) ->
     Приоритет:
     1. Личные слова пользователя (owner_user = user_id)
     2. Избранные слова (UserFavorite)
-    3. Случайные слова из главного словаря
+    3. Случайные слова из главного словаря (выборка из пула в памяти,
+       при нехватке — точный запрос по словарю)
 
     Исключает уже выученные слова (is_memorized = True).
 
@@ -227,137 +350,163 @@ def get_words_for_learning(session: Session, user_id: int, limit: int = None) ->
         limit = settings.WORDS_PER_SESSION
 
     # Сначала сбрасываем устаревший прогресс
-    check_and_reset_stale_progress(session, user_id)
+    # (в режиме 'sweep' это делает глобальная фоновая очистка,
+    # в режиме 'lazy' серия вычисляется при чтении через effective_streak)
+    if settings.STALE_RESET_MODE == 'session':
+        check_and_reset_stale_progress(session, user_id)
 
     results = []
     used_ids = set()
 
-    # Получаем ID выученных слов для исключения
-    memorized_stmt = select(UserTranslationProgress.translate_id).where(
+    # Выученные слова исключаем подзапросом NOT EXISTS по прогрессу,
+    # а не списком id: размер запроса не растет с числом выученных слов
+    memorized = exists().where(
         and_(
             UserTranslationProgress.user_id == user_id,
+            UserTranslationProgress.translate_id == Translate.id,
             UserTranslationProgress.is_memorized == True
         )
     )
-    memorized_ids = set(session.execute(memorized_stmt).scalars().all())
 
     # 1. Личные слова пользователя (не выученные)
-    user_words_stmt = select(Translate).where(
+    user_words_stmt = select_word_pairs().where(
         and_(
             Translate.owner_user == user_id,
-            ~Translate.id.in_(memorized_ids) if memorized_ids else True
+            ~memorized
         )
-    )
-    user_words = session.execute(user_words_stmt).scalars().all()
+    ).limit(limit)
 
-    for word in user_words:
-        if len(results) >= limit:
-            break
-        results.append({
-            'translate_id': word.id,
-            'word_en': word.word_en.word,
-            'word_ru': word.word_ru.word,
-            'transcription': word.word_en.transcription,
-            'is_user_word': True
-        })
-        used_ids.add(word.id)
-
-    # 2. Избранные слова (не выученные)
+    for row in session.execute(user_words_stmt):
+        results.append(word_pair_to_dict(row, is_user_word=True))
+        used_ids.add(row.translate_id)
+
+    # 2. Избранные слова (не выученные) — из БД только id, текст из словаря в памяти
     if len(results) < limit:
-        favorites_stmt = select(UserFavorite).where(
+        favorites_stmt = select(Translate.id).join(
+            UserFavorite, UserFavorite.translate_id == Translate.id
+        ).where(
             and_(
                 UserFavorite.user_id == user_id,
-                ~UserFavorite.translate_id.in_(memorized_ids) if memorized_ids else True,
+                ~memorized,
                 ~UserFavorite.translate_id.in_(used_ids) if used_ids else True
             )
-        )
-        favorites = session.execute(favorites_stmt).scalars().all()
-
-        for fav in favorites:
-            if len(results) >= limit:
-                break
-            translate = fav.translate
-            results.append({
-                'translate_id': translate.id,
-                'word_en': translate.word_en.word,
-                'word_ru': translate.word_ru.word,
-                'transcription': translate.word_en.transcription,
-                'is_user_word': False
-            })
-            used_ids.add(translate.id)
+        ).limit(limit - len(results))
+
+        favorite_ids = session.execute(favorites_stmt).scalars().all()
+        results.extend(get_global_pairs(session, favorite_ids, is_user_word=False))
+        used_ids.update(favorite_ids)
 
     # 3. Случайные слова из главного словаря
-    if len(results) < limit:
+    # Кандидатов выбираем из пула в памяти с запасом, выученные отсекаем одним запросом.
+    # Если почти все кандидаты выучены, повторяем с большим запасом.
+    tried_ids = set(used_ids)
+    for attempt in range(RANDOM_SAMPLE_ROUNDS):
         remaining = limit - len(results)
-        exclude_ids = used_ids | memorized_ids
+        if remaining <= 0:
+            break
 
-        random_stmt = select(Translate).where(
+        random_ids = global_pairs.sample(session, remaining * 2 ** (attempt + 1), exclude=tried_ids)
+        if not random_ids:
+            break
+        tried_ids.update(random_ids)
+
+        # Выученные отсекаем поиском по (user_id, translate_id), а не NOT EXISTS: при устаревшей
+        # статистике планировщик превращал NOT EXISTS в anti join по всем выученным словам
+        memorized_ids = get_memorized_ids(session, user_id, random_ids)
+        candidates = [translate_id for translate_id in random_ids if translate_id not in memorized_ids][:remaining]
+        # Пары, удаленные после загрузки пула, пропускает get_global_pairs
+        results.extend(get_global_pairs(session, candidates, is_user_word=False))
+        used_ids.update(candidates)
+
+    # 4. Пользователь выучил почти весь словарь и выборки не хватило — добираем
+    # точным запросом (полный проход по словарю, поэтому только в этом случае)
+    remaining = limit - len(results)
+    if remaining > 0:
+        exact_stmt = select(Translate.id).where(
             and_(
                 Translate.owner_user.is_(None),
-                ~Translate.id.in_(exclude_ids) if exclude_ids else True
+                ~memorized,
+                ~Translate.id.in_(used_ids) if used_ids else True
             )
         ).order_by(func.random()).limit(remaining)
 
-        random_words = session.execute(random_stmt).scalars().all()
-
-        for word in random_words:
-            results.append({
-                'translate_id': word.id,
-                'word_en': word.word_en.word,
-                'word_ru': word.word_ru.word,
-                'transcription': word.word_en.transcription,
-                'is_user_word': False
-            })
+        exact_ids = session.execute(exact_stmt).scalars().all()
+        results.extend(get_global_pairs(session, exact_ids, is_user_word=False))
 
     return results
 
 
-def get_word_progress(session: Session, user_id: int, translate_id: int) -> dict | None:
-    """Получает прогресс изучения конкретного слова.
+def get_favorite_ids(session: Session, user_id: int, translate_ids: list[int]) -> set[int]:
+    """Возвращает, какие из пар уже в избранном пользователя (один запрос).
 
     Args:
         session (Session): Сессия подключения к БД
         user_id (int): id пользователя
-        translate_id (int): id пары слов
+        translate_ids (list[int]): id пар для проверки
 
     Returns:
-        dict | None: Информация о прогрессе или None
+        set[int]: id пар из translate_ids, которые есть в избранном
     """
-    progress = get_or_create_progress(session, user_id, translate_id)
+    if not translate_ids:
+        return set()
 
-    return {
-        'correct_streak': progress.correct_streak,
-        'is_memorized': progress.is_memorized,
-        'last_attempt_at': progress.last_attempt_at
-    }
+    favorites_stmt = select(UserFavorite.translate_id).where(
+        and_(
+            UserFavorite.user_id == user_id,
+            UserFavorite.translate_id.in_(translate_ids)
+        )
+    )
+    return set(session.execute(favorites_stmt).scalars().all())
 
 
-def get_wrong_options(session: Session, correct_translate_id: int, count: int = 3) -> list[str]:
-    """Получает неправильные варианты ответов для викторины.
+def get_memorized_ids(session: Session, user_id: int, translate_ids: list[int] | None = None) -> set[int]:
+    """Возвращает, какие из пар пользователь уже выучил (один запрос).
 
     Args:
         session (Session): Сессия подключения к БД
-        correct_translate_id (int): id правильной пары слов
-        count (int): Количество неправильных вариантов
+        user_id (int): id пользователя
+        translate_ids (list[int] | None): id пар для проверки, None — все выученные пары
 
     Returns:
-        list[str]: Список неправильных английских слов
+        set[int]: id пар из translate_ids с is_memorized = True
     """
-    # Получаем правильный перевод для исключения
-    correct = session.get(Translate, correct_translate_id)
-    if correct is None:
-        return []
+    if translate_ids is not None and not translate_ids:
+        return set()
 
-    correct_en_id = correct.word_e
+    memorized_stmt = select(UserTranslationProgress.translate_id).where(
+        and_(
+            UserTranslationProgress.user_id == user_id,
+            UserTranslationProgress.translate_id.in_(translate_ids) if translate_ids is not None else True,
+            UserTranslationProgress.is_memorized == True
+        )
+    )
+    return set(session.execute(memorized_stmt).scalars().all())
 
-    # Выбираем случайные английские слова, кроме правильного
-    stmt = select(WordEn).where(
-        WordEn.id != correct_en_id
-    ).order_by(func.random()).limit(count)
 
-    wrong_words = session.execute(stmt).scalars().all()
+def get_word_progress(session: Session, user_id: int, translate_id: int) -> dict | None:
+    """Получает прогресс изучения конкретного слова.
+
+    Args:
+        session (Session): Сессия подключения к БД
+        user_id (int): id пользователя
+        translate_id (int): id пары слов
+
+    Returns:
+        dict | None: Информация о прогрессе или None
+    """
+    progress = get_or_create_progress(session, user_id, translate_id)
+
+    # Устаревшая серия считается нулевой (см. effective_streak)
+    correct_streak = progress.correct_streak
+    if not progress.is_memorized and progress.last_attempt_at is not None \
+            and progress.last_attempt_at < stale_threshold():
+        correct_streak = 0
 
-    return [word.word for word in wrong_words]
+    return {
+        'correct_streak': correct_streak,
+        'is_memorized': progress.is_memorized,
+        'last_attempt_at': progress.last_attempt_at
+    }
 
 
 def reset_word_progress(session: Session, user_id: int, translate_id: int) -> bool:
@@ -0,0 +1,74 @@
+# Сохраненные сессии обучения (таблица learning_session)
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from sql_db.models import SavedLearningSession
+
+
+def save_learning_sessions(session: Session, payloads: dict[int, bytes]):
+    """Записывает сессии обучения одним многострочным upsert.
+
+    Args:
+        session (Session): Сессия подключения к БД
+        payloads (dict[int, bytes]): Telegram ID → сериализованное состояние
+    """
+    if not payloads:
+        return
+
+    now = datetime.utcnow()
+    stmt = pg_insert(SavedLearningSession).values(
+        [{'tg_id': tg_id, 'payload': payload, 'updated_at': now} for tg_id, payload in payloads.items()]
+    )
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=['tg_id'],
+        set_={'payload': stmt.excluded.payload, 'updated_at': stmt.excluded.updated_at},
+    ))
+
+
+def delete_learning_sessions(session: Session, tg_ids: list[int]):
+    """Удаляет сохраненные сессии (пользователь вышел из режима обучения).
+
+    Args:
+        session (Session): Сессия подключения к БД
+        tg_ids (list[int]): Telegram ID пользователей
+    """
+    if tg_ids:
+        session.execute(delete(SavedLearningSession).where(SavedLearningSession.tg_id.in_(tg_ids)))
+
+
+def load_learning_session(session: Session, tg_id: int, max_age: int) -> bytes | None:
+    """Возвращает сохраненную сессию пользователя, если она не устарела.
+
+    Args:
+        session (Session): Сессия подключения к БД
+        tg_id (int): Telegram ID пользователя
+        max_age (int): Сколько секунд с последнего сохранения сессия считается живой
+
+    Returns:
+        bytes | None: Сериализованное состояние или None
+    """
+    stmt = select(SavedLearningSession.payload).where(
+        SavedLearningSession.tg_id == tg_id,
+        SavedLearningSession.updated_at >= datetime.utcnow() - timedelta(seconds=max_age)
+    )
+    return session.execute(stmt).scalar_one_or_none()
+
+
+def delete_expired_learning_sessions(session: Session, max_age: int) -> int:
+    """Удаляет сессии, брошенные дольше max_age секунд назад.
+
+    Args:
+        session (Session): Сессия подключения к БД
+        max_age (int): Время жизни сохраненной сессии в секундах
+
+    Returns:
+        int: Количество удаленных сессий
+    """
+    stmt = delete(SavedLearningSession).where(
+        SavedLearningSession.updated_at < datetime.utcnow() - timedelta(seconds=max_age)
+    )
+    return session.execute(stmt).rowcount
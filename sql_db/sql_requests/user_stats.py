@@ -0,0 +1,118 @@
+# Счетчики статистики пользователя (таблица user_stats)
+#
+# Счетчики только увеличиваются/уменьшаются на дельту (UPDATE ... SET x = x + n),
+# поэтому строка должна существовать до первого изменения:
+#     - новым пользователям она создается вместе с пользователем (init_user_counters)
+#     - пользователям, зарегистрированным раньше, ее досчитывает миграция (sql_db/migrations.py)
+# Если строки все же нет, она считается по основным таблицам при первом открытии статистики.
+
+from sqlalchemy import select, update, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from sql_db.attempt_journal import attempt_journal
+from sql_db.models import Translate, UserAttempt, UserFavorite, UserStats
+
+
+COUNTER_FIELDS = ('total_attempts', 'correct_attempts', 'user_words_count', 'favorites_count')
+
+
+def bump_user_stats_stmt(user_id: int, **deltas: int):
+    """Формирует UPDATE счетчиков пользователя на заданные дельты.
+
+    Args:
+        user_id (int): id пользователя
+        **deltas (int): Изменения счетчиков, например total_attempts=1
+
+    Returns:
+        Update | None: Запрос или None, если все дельты нулевые
+    """
+    values = {
+        name: getattr(UserStats, name) + delta
+        for name, delta in deltas.items() if delta
+    }
+    if not values:
+        return None
+
+    return update(UserStats).where(UserStats.user_id == user_id).values(**values)
+
+
+def bump_user_stats(session: Session, user_id: int, **deltas: int):
+    """Изменяет счетчики пользователя на заданные дельты.
+
+    Args:
+        session (Session): Сессия подключения к БД
+        user_id (int): id пользователя
+        **deltas (int): Изменения счетчиков, например favorites_count=-1
+    """
+    stmt = bump_user_stats_stmt(user_id, **deltas)
+    if stmt is not None:
+        session.execute(stmt)
+
+
+def init_user_counters(session: Session, user_id: int):
+    """Создает нулевую строку user_stats для нового пользователя.
+
+    Args:
+        session (Session): Сессия подключения к БД
+        user_id (int): id только что созданного пользователя
+    """
+    session.execute(
+        pg_insert(UserStats).values(user_id=user_id, **dict.fromkeys(COUNTER_FIELDS, 0)).on_conflict_do_nothing(
+            index_elements=[UserStats.user_id]
+        )
+    )
+
+
+def count_user_stats(session: Session, user_id: int) -> dict:
+    """Считает счетчики пользователя по основным таблицам одним запросом.
+
+    Используется для первого заполнения строки user_stats.
+
+    Args:
+        session (Session): Сессия подключения к БД
+        user_id (int): id пользователя
+
+    Returns:
+        dict: Значения всех полей COUNTER_FIELDS
+    """
+    attempts = select(
+        func.count().label('total_attempts'),
+        func.count().filter(UserAttempt.is_correct == True).label('correct_attempts')
+    ).where(UserAttempt.user_id == user_id).subquery()
+
+    user_words_count = select(func.count()).where(Translate.owner_user == user_id).scalar_subquery()
+    favorites_count = select(func.count()).where(UserFavorite.user_id == user_id).scalar_subquery()
+
+    row = session.execute(
+        select(
+            attempts.c.total_attempts,
+            attempts.c.correct_attempts,
+            user_words_count.label('user_words_count'),
+            favorites_count.label('favorites_count')
+        )
+    ).one()
+
+    return {name: getattr(row, name) for name in COUNTER_FIELDS}
+
+
+def create_user_counters(session: Session, user_id: int) -> dict:
+    """Создает строку user_stats, посчитав счетчики по основным таблицам.
+
+    Args:
+        session (Session): Сессия подключения к БД
+        user_id (int): id пользователя
+
+    Returns:
+        dict: Значения всех полей COUNTER_FIELDS
+    """
+    # Попытки из отложенной записи должны попасть в подсчет
+    attempt_journal.flush()
+    counters = count_user_stats(session, user_id)
+
+    session.execute(
+        pg_insert(UserStats).values(user_id=user_id, **counters).on_conflict_do_nothing(
+            index_elements=[UserStats.user_id]
+        )
+    )
+    return counters
@@ -4,6 +4,14 @@ from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from sql_db.models import User
+from sql_db.lru_cache import LRUCache
+from sql_db.sql_requests.user_stats import init_user_counters
+from config.settings import settings
+
+
+# Кэш соответствия Telegram ID → id пользователя в БД
+# Telegram ID пользователя не меняется, поэтому запись безопасно хранить до TTL
+user_id_cache = LRUCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
 
 def get_user(session: Session,
              user_nickname: str | None = None, 
@@ -72,6 +80,7 @@ def create_user(session: Session, user_nikname: str) -> int | None:
         session.add(new_user)
         session.flush()
         db_user_id = new_user.id
+        init_user_counters(session, db_user_id)
         print(f'Пользователь добавлен в БД: {db_user_id}')
         return db_user_id
 
@@ -80,16 +89,59 @@ def create_user(session: Session, user_nikname: str) -> int | None:
     return None
 
 
-def get_or_create_user(session: Session, user_nickname: str) -> int | None:
+def get_user_by_tg_id(session: Session, tg_id: int, user_nickname: str | None = None) -> int | None:
+    """Ищет пользователя по Telegram ID.
+
+    Сначала проверяет кэш в памяти — в этом случае запроса в БД нет.
+    Пользователей, зарегистрированных до появления колонки tg_id, находит по никнейму
+    и сразу дописывает им tg_id.
+
+    Args:
+        session (Session): Сессия подключения к БД
+        tg_id (int): Telegram ID пользователя
+        user_nickname (str | None): Телеграм никнейм (нужен только для старых записей без tg_id)
+
+    Returns:
+        int | None: id пользователя в базе или None, если пользователь не зарегистрирован
+    """
+    user_id = user_id_cache.get(tg_id)
+    if user_id is not None:
+        return user_id
+
+    user_id = session.execute(
+        select(User.id).where(User.tg_id == tg_id)
+    ).scalar_one_or_none()
+
+    if user_id is None and user_nickname is not None:
+        # Старая запись без tg_id — ищем по никнейму и дописываем tg_id
+        obj_user = session.execute(
+            select(User).where(User.user_tg_nickname == user_nickname, User.tg_id.is_(None))
+        ).scalar_one_or_none()
+
+        if obj_user is not None:
+            obj_user.tg_id = tg_id
+            session.flush()
+            user_id = obj_user.id
+
+    if user_id is not None:
+        user_id_cache.set(tg_id, user_id)
+
+    return user_id
+
+
+def get_or_create_user(session: Session, user_nickname: str, tg_id: int | None = None) -> int | None:
     """Получает существующего пользователя или создает нового.
 
     Главная функция для работы с пользователями в боте.
     Если пользователь существует — возвращает его id.
     Если не существует — создает и возвращает id нового пользователя.
 
+    Если передан tg_id, пользователь ищется по нему, а сменившийся никнейм обновляется.
+
     Args:
         session (Session): Сессия подключения к БД
         user_nickname (str): Телеграм никнейм пользователя
+        tg_id (int | None): Telegram ID пользователя
 
     Returns:
         int | None: id пользователя или None при ошибке
@@ -98,19 +150,41 @@ def get_or_create_user(session: Session, user_nickname: str) -> int | None:
         print('Ошибка: некорректный никнейм пользователя')
         return None
 
-    # Пробуем найти существующего пользователя
-    user_id = get_user(session=session, user_nickname=user_nickname)
+    if tg_id is not None:
+        user_id = get_user_by_tg_id(session, tg_id, user_nickname=user_nickname)
+
+        if user_id is not None:
+            # Никнейм в Telegram мог смениться — обновляем, если новый не занят
+            obj_user = session.get(User, user_id)
+            if obj_user.user_tg_nickname != user_nickname and \
+                    get_user(session=session, user_nickname=user_nickname) is None:
+                obj_user.user_tg_nickname = user_nickname
+                session.flush()
+            return user_id
+    else:
+        # Пробуем найти существующего пользователя
+        user_id = get_user(session=session, user_nickname=user_nickname)
 
-    if user_id is not None:
-        print(f'Пользователь найден: {user_id}')
-        return user_id
+        if user_id is not None:
+            print(f'Пользователь найден: {user_id}')
+            return user_id
+
+    # Если не найден — создаем нового.
+    # Никнейм может быть занят другим аккаунтом Telegram (старая запись без tg_id
+    # уже найдена бы в get_user_by_tg_id) — тогда используем никнейм по tg_id
+    if tg_id is not None and get_user(session=session, user_nickname=user_nickname) is not None:
+        print(f'Никнейм {user_nickname} занят другим пользователем')
+        user_nickname = f'user_{tg_id}'
 
-    # Если не найден — создаем нового
-    new_user = User(user_tg_nickname=user_nickname)
+    new_user = User(user_tg_nickname=user_nickname, tg_id=tg_id)
     session.add(new_user)
     session.flush()
     user_id = new_user.id
+    init_user_counters(session, user_id)
     print(f'Создан новый пользователь: {user_id}')
+
+    if tg_id is not None:
+        user_id_cache.set(tg_id, user_id)
     return user_id
 
 
@@ -127,7 +201,7 @@ def delete_user(session: Session, user_id: int) -> bool:
     Returns:
         bool: True если удаление успешно, False при ошибке
     """
-    from sql_db.models import UserTranslationProgress, UserAttempt, UserFavorite, Translate
+    from sql_db.models import UserTranslationProgress, UserAttempt, UserFavorite, Translate, UserStats
 
     # Проверяем существование пользователя
     user = session.get(User, user_id)
@@ -151,12 +225,19 @@ def delete_user(session: Session, user_id: int) -> bool:
         UserFavorite.user_id == user_id
     ).delete()
 
-    # 4. Личные слова пользователя (Translate с owner_user = user_id)
+    # 4. Счетчики статистики
+    session.query(UserStats).filter(
+        UserStats.user_id == user_id
+    ).delete()
+
+    # 5. Личные слова пользователя (Translate с owner_user = user_id)
     session.query(Translate).filter(
         Translate.owner_user == user_id
     ).delete()
 
-    # 5. Удаляем самого пользователя
+    # 6. Удаляем самого пользователя
+    if user.tg_id is not None:
+        user_id_cache.pop(user.tg_id)
     session.delete(user)
     session.flush()
 
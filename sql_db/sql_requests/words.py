@@ -1,9 +1,82 @@
 # Файл обработки слов и переводов
 
-from sqlalchemy import select, and_, or_, func
+from sqlalchemy import select, delete, and_, or_
 from sqlalchemy.orm import Session
 
-from sql_db.models import WordEn, WordRu, Translate, User, UserFavorite
+from sql_db.models import WordEn, WordRu, Translate, User, UserFavorite, UserTranslationProgress, UserAttempt
+from sql_db.attempt_journal import attempt_journal
+from sql_db.dictionary_cache import global_pairs, dictionary_store
+from sql_db.sql_requests.user_stats import bump_user_stats
+
+
+def select_word_pairs():
+    """Формирует запрос пар слов одной проекцией колонок.
+
+    Вместо ORM-объектов Translate (у которых каждое обращение к word_en / word_ru
+    делает отдельный SELECT) сразу соединяет translate с word_en и word_ru.
+    Строки результата содержат поля translate_id, word_en, word_ru,
+    transcription и owner_user.
+
+    Returns:
+        Select: Запрос, к которому можно добавить свои условия
+    """
+    return select(
+        Translate.id.label('translate_id'),
+        WordEn.word.label('word_en'),
+        WordRu.word.label('word_ru'),
+        WordEn.transcription,
+        Translate.owner_user
+    ).join(WordEn, Translate.word_e == WordEn.id).join(WordRu, Translate.word_r == WordRu.id)
+
+
+def word_pair_to_dict(row, **extra) -> dict:
+    """Преобразует строку из select_word_pairs в словарь для бота.
+
+    Args:
+        row (Row): Строка результата select_word_pairs
+        **extra: Дополнительные поля словаря (is_user_word, is_global)
+
+    Returns:
+        dict: {'translate_id', 'word_en', 'word_ru', 'transcription', **extra}
+    """
+    return {
+        'translate_id': row.translate_id,
+        'word_en': row.word_en,
+        'word_ru': row.word_ru,
+        'transcription': row.transcription,
+        **extra
+    }
+
+
+def get_global_pairs(session: Session, translate_ids: list[int], **extra) -> list[dict]:
+    """Получает пары главного словаря по id.
+
+    Текст берется из DictionaryStore в памяти; одним запросом к БД
+    дочитываются только пары, которых в нем нет (словарь в памяти устарел).
+
+    Args:
+        session (Session): Сессия подключения к БД
+        translate_ids (list[int]): id пар
+        **extra: Дополнительные поля словаря (is_user_word, is_global)
+
+    Returns:
+        list[dict]: Пары в порядке translate_ids (ненайденные пропускаются)
+    """
+    pairs = {}
+    missing = []
+    for translate_id in translate_ids:
+        pair = dictionary_store.get(translate_id, session=session)
+        if pair is None:
+            missing.append(translate_id)
+        else:
+            pairs[translate_id] = {**pair, **extra}
+
+    if missing:
+        stmt = select_word_pairs().where(Translate.id.in_(missing))
+        for row in session.execute(stmt):
+            pairs[row.translate_id] = word_pair_to_dict(row, **extra)
+
+    return [pairs[translate_id] for translate_id in translate_ids if translate_id in pairs]
 
 
 def get_or_create_word_en(session: Session, word: str, transcription: str | None = None) -> int:
@@ -117,6 +190,7 @@ def add_user_word(session: Session, user_id: int, word_en: str, word_ru: str,
         favorite = UserFavorite(user_id=user_id, translate_id=global_pair.id)
         session.add(favorite)
         session.flush()
+        bump_user_stats(session, user_id, favorites_count=1)
         return {
             'success': True,
             'translate_id': global_pair.id,
@@ -150,6 +224,7 @@ def add_user_word(session: Session, user_id: int, word_en: str, word_ru: str,
     )
     session.add(new_translate)
     session.flush()
+    bump_user_stats(session, user_id, user_words_count=1)
     print(f'Добавлена личная пара слов: {new_translate.id}')
     return {
         'success': True,
@@ -171,29 +246,16 @@ def find_word_in_db(session: Session, word: str, is_english: bool = True) -> lis
         list[dict]: Список найденных пар с переводами
     """
     word_lower = word.lower().strip()
-    results = []
 
     if is_english:
-        stmt = select(Translate).join(WordEn).where(
-            WordEn.word.ilike(f'%{word_lower}%')
-        )
+        stmt = select_word_pairs().where(WordEn.word.ilike(f'%{word_lower}%'))
     else:
-        stmt = select(Translate).join(WordRu).where(
-            WordRu.word.ilike(f'%{word_lower}%')
-        )
+        stmt = select_word_pairs().where(WordRu.word.ilike(f'%{word_lower}%'))
 
-    pairs = session.execute(stmt).scalars().all()
-
-    for pair in pairs:
-        results.append({
-            'translate_id': pair.id,
-            'word_en': pair.word_en.word,
-            'word_ru': pair.word_ru.word,
-            'transcription': pair.word_en.transcription,
-            'is_global': pair.owner_user is None
-        })
-
-    return results
+    return [
+        word_pair_to_dict(row, is_global=row.owner_user is None)
+        for row in session.execute(stmt)
+    ]
 
 
 def add_to_favorites(session: Session, user_id: int, translate_id: int) -> bool:
@@ -236,6 +298,7 @@ def add_to_favorites(session: Session, user_id: int, translate_id: int) -> bool:
     favorite = UserFavorite(user_id=user_id, translate_id=translate_id)
     session.add(favorite)
     session.flush()
+    bump_user_stats(session, user_id, favorites_count=1)
     print(f'Слово добавлено в избранное')
     return True
 
@@ -265,6 +328,7 @@ def remove_from_favorites(session: Session, user_id: int, translate_id: int) ->
 
     session.delete(favorite)
     session.flush()
+    bump_user_stats(session, user_id, favorites_count=-1)
     print('Слово удалено из избранного')
     return True
 
@@ -287,33 +351,18 @@ def get_user_favorites(session: Session, user_id: int) -> list[dict]:
     used_ids = set()
 
     # 1. Личные слова пользователя (owner_user = user_id)
-    user_words_stmt = select(Translate).where(Translate.owner_user == user_id)
-    user_words = session.execute(user_words_stmt).scalars().all()
-
-    for pair in user_words:
-        results.append({
-            'translate_id': pair.id,
-            'word_en': pair.word_en.word,
-            'word_ru': pair.word_ru.word,
-            'transcription': pair.word_en.transcription,
-            'is_user_word': True  # Личное слово пользователя
-        })
-        used_ids.add(pair.id)
-
-    # 2. Глобальные слова в избранном (UserFavorite)
-    fav_stmt = select(UserFavorite).where(UserFavorite.user_id == user_id)
-    favorites = session.execute(fav_stmt).scalars().all()
-
-    for fav in favorites:
-        if fav.translate_id not in used_ids:
-            translate = fav.translate
-            results.append({
-                'translate_id': translate.id,
-                'word_en': translate.word_en.word,
-                'word_ru': translate.word_ru.word,
-                'transcription': translate.word_en.transcription,
-                'is_user_word': False  # Глобальное слово в избранном
-            })
+    user_words_stmt = select_word_pairs().where(Translate.owner_user == user_id)
+
+    for row in session.execute(user_words_stmt):
+        results.append(word_pair_to_dict(row, is_user_word=True))  # Личное слово пользователя
+        used_ids.add(row.translate_id)
+
+    # 2. Глобальные слова в избранном (UserFavorite), текст — из словаря в памяти
+    fav_stmt = select(UserFavorite.translate_id).where(UserFavorite.user_id == user_id).order_by(UserFavorite.id)
+    favorite_ids = [translate_id for translate_id in session.execute(fav_stmt).scalars() if translate_id not in used_ids]
+
+    # Глобальное слово в избранном
+    results.extend(get_global_pairs(session, favorite_ids, is_user_word=False))
 
     return results
 
@@ -328,19 +377,39 @@ def get_user_words(session: Session, user_id: int) -> list[dict]:
     Returns:
         list[dict]: Список личных пар слов пользователя
     """
-    stmt = select(Translate).where(Translate.owner_user == user_id)
-    pairs = session.execute(stmt).scalars().all()
+    stmt = select_word_pairs().where(Translate.owner_user == user_id)
 
-    results = []
-    for pair in pairs:
-        results.append({
-            'translate_id': pair.id,
-            'word_en': pair.word_en.word,
-            'word_ru': pair.word_ru.word,
-            'transcription': pair.word_en.transcription
-        })
+    return [word_pair_to_dict(row) for row in session.execute(stmt)]
 
-    return results
+
+def delete_pair_history(session: Session, user_id: int, translate_id: int):
+    """Удаляет прогресс и историю попыток личной пары слов перед удалением самой пары.
+
+    Попытки, еще ожидающие отложенной записи, убираются из буфера журнала
+    (в БД ради удаления они не пишутся), а счетчики статистики уменьшаются
+    на количество удаленных попыток.
+
+    Args:
+        session (Session): Сессия подключения к БД
+        user_id (int): id владельца пары
+        translate_id (int): id пары слов из Translate
+    """
+    # Попытки из буфера уже учтены в счетчиках, но в БД еще не записаны
+    deleted = attempt_journal.discard_pair(translate_id)
+
+    # Удаляем связанный прогресс
+    session.query(UserTranslationProgress).filter(
+        UserTranslationProgress.translate_id == translate_id
+    ).delete()
+
+    # Удаляем историю попыток
+    deleted += session.execute(
+        delete(UserAttempt).where(UserAttempt.translate_id == translate_id).returning(UserAttempt.is_correct)
+    ).scalars().all()
+
+    bump_user_stats(session, user_id,
+                    total_attempts=-len(deleted),
+                    correct_attempts=-sum(deleted))
 
 
 def delete_user_word(session: Session, user_id: int, translate_id: int) -> bool:
@@ -356,8 +425,6 @@ def delete_user_word(session: Session, user_id: int, translate_id: int) -> bool:
     Returns:
         bool: True если удалено успешно, False при ошибке
     """
-    from sql_db.models import UserTranslationProgress, UserAttempt
-
     stmt = select(Translate).where(
         and_(
             Translate.id == translate_id,
@@ -370,19 +437,13 @@ def delete_user_word(session: Session, user_id: int, translate_id: int) -> bool:
         print('Слово не найдено или не принадлежит пользователю')
         return False
 
-    # Удаляем связанный прогресс
-    session.query(UserTranslationProgress).filter(
-        UserTranslationProgress.translate_id == translate_id
-    ).delete()
-
-    # Удаляем историю попыток
-    session.query(UserAttempt).filter(
-        UserAttempt.translate_id == translate_id
-    ).delete()
+    # Удаляем прогресс и историю попыток
+    delete_pair_history(session, user_id, translate_id)
 
     # Удаляем саму пару
     session.delete(pair)
     session.flush()
+    bump_user_stats(session, user_id, user_words_count=-1)
     print(f'Слово {translate_id} удалено')
     return True
 
@@ -424,25 +485,11 @@ def get_random_words(session: Session, user_id: int, limit: int = 20) -> list[di
                 results.append(fav)
                 used_ids.add(fav['translate_id'])
 
-    # 3. Рандом из главного словаря
+    # 3. Рандом из главного словаря (id выбираем из пула в памяти)
     if len(results) < limit:
         remaining = limit - len(results)
-        stmt = select(Translate).where(
-            and_(
-                Translate.owner_user.is_(None),
-                ~Translate.id.in_(used_ids) if used_ids else True
-            )
-        ).order_by(func.random()).limit(remaining)
-
-        random_pairs = session.execute(stmt).scalars().all()
-
-        for pair in random_pairs:
-            results.append({
-                'translate_id': pair.id,
-                'word_en': pair.word_en.word,
-                'word_ru': pair.word_ru.word,
-                'transcription': pair.word_en.transcription
-            })
+        random_ids = global_pairs.sample(session, remaining, exclude=used_ids)
+        results.extend(get_global_pairs(session, random_ids))
 
     return results
 
@@ -482,8 +529,6 @@ def remove_word_from_user_list(session: Session, user_id: int, translate_id: int
     Returns:
         dict: {'success': bool, 'message': str}
     """
-    from sql_db.models import UserTranslationProgress, UserAttempt
-
     # Проверяем, существует ли пара
     translate = session.get(Translate, translate_id)
     if translate is None:
@@ -491,19 +536,13 @@ def remove_word_from_user_list(session: Session, user_id: int, translate_id: int
 
     # Если это личное слово пользователя — удаляем полностью
     if translate.owner_user == user_id:
-        # Удаляем связанный прогресс
-        session.query(UserTranslationProgress).filter(
-            UserTranslationProgress.translate_id == translate_id
-        ).delete()
-
-        # Удаляем историю попыток
-        session.query(UserAttempt).filter(
-            UserAttempt.translate_id == translate_id
-        ).delete()
+        # Удаляем прогресс и историю попыток
+        delete_pair_history(session, user_id, translate_id)
 
         # Удаляем саму пару
         session.delete(translate)
         session.flush()
+        bump_user_stats(session, user_id, user_words_count=-1)
         return {'success': True, 'message': 'Слово удалено'}
 
     # Если это глобальное слово — удаляем из избранного
@@ -520,4 +559,5 @@ def remove_word_from_user_list(session: Session, user_id: int, translate_id: int
 
     session.delete(favorite)
     session.flush()
+    bump_user_stats(session, user_id, favorites_count=-1)
     return {'success': True, 'message': 'Слово удалено из избранного'}
@@ -0,0 +1,38 @@
+# Общие фикстуры тестов с БД PostgreSQL из .env.
+# Если БД недоступна или словарь не импортирован, такие тесты пропускаются.
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from sql_db.db_init import engine
+from sql_db.models import Translate
+
+
+@pytest.fixture
+def session():
+    """Сессия в транзакции, которая откатывается после теста."""
+    try:
+        connection = engine.connect()
+    except OperationalError as e:
+        pytest.skip(f'БД недоступна: {e}')
+
+    session = Session(bind=connection)
+    try:
+        yield session
+    finally:
+        session.close()
+        connection.rollback()
+        connection.close()
+
+
+@pytest.fixture
+def global_ids(session) -> list[int]:
+    """id первых пар главного словаря."""
+    ids = session.execute(
+        select(Translate.id).where(Translate.owner_user.is_(None)).order_by(Translate.id).limit(20)
+    ).scalars().all()
+    if len(ids) < 20:
+        pytest.skip('Главный словарь не импортирован')
+    return ids
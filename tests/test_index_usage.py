@@ -0,0 +1,109 @@
+# Горячие запросы статистики и обучения читают таблицы по индексам, а не полным проходом.
+#
+# SQL запросов get_user_stats и get_words_for_learning перехватывается, и для каждого
+# строится план EXPLAIN. На маленькой БД планировщик и так предпочитает Seq Scan, поэтому
+# на время проверки он отключен (enable_seqscan = off). Проблемой считается чтение горячей
+# таблицы через Seq Scan или Index Scan без Index Cond (полный проход по индексу) —
+# значит, подходящего индекса нет (см. MIGRATIONS в sql_db/migrations.py).
+#
+# Нужна БД PostgreSQL из .env с импортированным словарем, изменения откатываются:
+#     python -m pytest tests/test_index_usage.py
+
+import re
+
+from sqlalchemy import insert, event
+from sqlalchemy.orm import Session
+
+from sql_db.models import User, UserFavorite, UserTranslationProgress, UserAttempt
+from sql_db.sql_requests.learning import get_user_stats, get_words_for_learning
+
+# Таблицы, по которым горячие запросы не должны читаться полным сканированием
+HOT_TABLES = ('user_attempts', 'user_translation_progress', 'translate', 'user_favorite')
+
+SCAN_NODE = re.compile(r'(Seq Scan|Index Only Scan|Index Scan)(?: Backward)?(?: using \w+)? on (\w+)')
+
+
+def find_full_scans(plan: list[str]) -> list[tuple[str, str]]:
+    """Находит в плане EXPLAIN полные проходы по горячим таблицам.
+
+    Args:
+        plan (list[str]): Строки плана EXPLAIN
+
+    Returns:
+        list[tuple[str, str]]: Пары (тип сканирования, таблица)
+    """
+    # Разбираем план на узлы сканирования: строка узла и строки его условий
+    nodes = []
+    for line in plan:
+        match = SCAN_NODE.search(line)
+        if match:
+            nodes.append([match.group(1), match.group(2), False])
+        elif '->' in line:
+            nodes.append(None)
+        elif nodes and nodes[-1] is not None and 'Index Cond' in line:
+            nodes[-1][2] = True
+
+    return [
+        (scan, table) for scan, table, has_index_cond in filter(None, nodes)
+        if table in HOT_TABLES and (scan == 'Seq Scan' or not has_index_cond)
+    ]
+
+
+def create_learner(session: Session, translate_ids: list[int]) -> int:
+    """Создает пользователя с избранным, прогрессом и попытками по парам translate_ids."""
+    user = User(user_tg_nickname='index_usage')
+    session.add(user)
+    session.flush()
+
+    session.execute(insert(UserFavorite), [
+        {'user_id': user.id, 'translate_id': translate_id} for translate_id in translate_ids[:3]
+    ])
+    session.execute(insert(UserTranslationProgress), [
+        {'user_id': user.id, 'translate_id': translate_id, 'correct_streak': 1, 'is_memorized': i % 2 == 0}
+        for i, translate_id in enumerate(translate_ids)
+    ])
+    session.execute(insert(UserAttempt), [
+        {'user_id': user.id, 'translate_id': translate_id, 'is_correct': True} for translate_id in translate_ids
+    ])
+    return user.id
+
+
+def test_find_full_scans():
+    plan = [
+        'Nested Loop  (cost=0.57..16.62 rows=1 width=4)',
+        '  ->  Index Scan using uq_user_translate on user_translation_progress  (cost=0.29..8.31 rows=1 width=4)',
+        '        Index Cond: (user_id = 1)',
+        '  ->  Index Only Scan using translate_pkey on translate  (cost=0.29..8.30 rows=1 width=4)',
+        '  ->  Seq Scan on user_attempts  (cost=0.00..35.50 rows=10 width=4)',
+        '  ->  Seq Scan on user_tg  (cost=0.00..1.01 rows=1 width=4)',
+    ]
+
+    assert find_full_scans(plan) == [('Index Only Scan', 'translate'), ('Seq Scan', 'user_attempts')]
+
+
+def test_hot_queries_use_indexes(session, global_ids):
+    user_id = create_learner(session, global_ids)
+    connection = session.connection()
+    connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(('SELECT', 'WITH', 'UPDATE')):
+            captured.append((statement, parameters))
+
+    event.listen(connection, 'before_cursor_execute', capture)
+    try:
+        get_user_stats(session, user_id)
+        get_words_for_learning(session, user_id)
+    finally:
+        event.remove(connection, 'before_cursor_execute', capture)
+
+    problems = []
+    for statement, parameters in captured:
+        plan = connection.exec_driver_sql('EXPLAIN ' + statement, parameters).scalars().all()
+        for scan, table in find_full_scans(plan):
+            problems.append(f'{scan} on {table}:\n{statement}\n' + '\n'.join(plan))
+
+    assert captured
+    assert problems == [], '\n\n'.join(problems)
@@ -0,0 +1,81 @@
+# Число SQL-запросов на путях чтения слов не зависит от количества слов в ответе
+# (слова собираются одним запросом с JOIN, без ленивой загрузки связей ORM).
+#
+# Нужна БД PostgreSQL из .env с импортированным словарем (python sql_db/create_db.py).
+# Все изменения делаются в транзакции, которая откатывается:
+#     python -m pytest tests
+
+import pytest
+from sqlalchemy import insert, event
+from sqlalchemy.orm import Session
+
+from sql_db.models import User, UserFavorite
+from sql_db.sql_requests.learning import get_words_for_learning
+from sql_db.sql_requests.words import get_user_favorites, get_random_words, find_word_in_db
+
+
+def create_user(session: Session, nickname: str, favorite_ids: list[int]) -> int:
+    """Создает пользователя с избранными парами favorite_ids."""
+    user = User(user_tg_nickname=nickname)
+    session.add(user)
+    session.flush()
+    if favorite_ids:
+        session.execute(insert(UserFavorite), [
+            {'user_id': user.id, 'translate_id': translate_id} for translate_id in favorite_ids
+        ])
+    return user.id
+
+
+def count_queries(session: Session, func, *args, **kwargs) -> tuple[int, list]:
+    """Выполняет func и считает отправленные в БД запросы.
+
+    Returns:
+        tuple[int, list]: Количество запросов и результат func
+    """
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    connection = session.connection()
+    event.listen(connection, 'before_cursor_execute', capture)
+    try:
+        result = func(session, *args, **kwargs)
+    finally:
+        event.remove(connection, 'before_cursor_execute', capture)
+    return len(statements), result
+
+
+def test_favorites_constant_queries(session, global_ids):
+    few = create_user(session, 'query_count_few', global_ids[:2])
+    many = create_user(session, 'query_count_many', global_ids)
+    # Первый вызов загружает словарь в память — его не считаем
+    get_user_favorites(session, few)
+
+    few_queries, few_words = count_queries(session, get_user_favorites, few)
+    many_queries, many_words = count_queries(session, get_user_favorites, many)
+
+    assert (len(few_words), len(many_words)) == (2, 20)
+    assert few_queries == many_queries
+
+
+@pytest.mark.parametrize('read_words', [get_words_for_learning, get_random_words])
+def test_learning_words_constant_queries(session, global_ids, read_words):
+    # Одного избранного слова мало для обоих лимитов: в обоих вызовах выполняются все этапы выборки
+    user_id = create_user(session, 'query_count_learning', global_ids[:1])
+    read_words(session, user_id, limit=5)
+
+    few_queries, few_words = count_queries(session, read_words, user_id, limit=5)
+    many_queries, many_words = count_queries(session, read_words, user_id, limit=20)
+
+    assert (len(few_words), len(many_words)) == (5, 20)
+    assert few_queries == many_queries
+
+
+def test_find_word_single_query(session, global_ids):
+    word = get_user_favorites(session, create_user(session, 'query_count_find', global_ids[:1]))[0]
+
+    queries, found = count_queries(session, find_word_in_db, word['word_en'])
+
+    assert word['translate_id'] in {pair['translate_id'] for pair in found}
+    assert queries == 1
@@ -0,0 +1,33 @@
+# Перестановка кандидатов сессии по зерну (SeededSession._permute).
+# БД PostgreSQL не нужна.
+#     python -m pytest tests/test_seeded_session.py
+
+import pytest
+
+from bot.states.seeded_session import SeededSession
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64, 100, 1000, 4097, 30011])
+@pytest.mark.parametrize('seed', [0, 1, 2 ** 61 + 12345])
+def test_permutation_is_bijection(size, seed):
+    learning = SeededSession(user_id=1, seed=seed, version=1, count=20)
+
+    permuted = [learning._permute(position, size) for position in range(size)]
+
+    assert sorted(permuted) == list(range(size))
+
+
+def test_permutation_depends_on_seed():
+    size = 1000
+    first = SeededSession(user_id=1, seed=1, version=1, count=20)
+    second = SeededSession(user_id=1, seed=2, version=1, count=20)
+
+    assert [first._permute(i, size) for i in range(20)] != [second._permute(i, size) for i in range(20)]
+
+
+def test_permutation_restored_from_bytes():
+    size = 1000
+    learning = SeededSession(user_id=1, seed=987654321, version=1, count=20)
+    restored = SeededSession.from_bytes(learning.to_bytes())
+
+    assert [restored._permute(i, size) for i in range(size)] == [learning._permute(i, size) for i in range(size)]
@@ -0,0 +1,120 @@
+# Хранилища состояний пользователей (MemoryStateStore, SqliteStateStore) и их сериализация.
+# БД PostgreSQL не нужна: SQLite-хранилище создается во временном каталоге.
+#     python -m pytest tests/test_state_store.py
+
+import time
+from array import array
+
+import pytest
+
+from bot.states.learning_session import LearningSession, IN_FAVORITES, IS_USER_WORD
+from bot.states.seeded_session import SeededSession
+from bot.states.state_codec import encode_state, decode_state
+from bot.states.state_store import MemoryStateStore, SqliteStateStore
+
+# Время жизни состояния в тестах на истечение
+SHORT_TTL = 0.2
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_store(request, tmp_path):
+    """Фабрика хранилища выбранного вида с заданным ttl."""
+    def make(ttl: float = 60):
+        if request.param == 'memory':
+            return MemoryStateStore(maxsize=100, ttl=ttl)
+        return SqliteStateStore(str(tmp_path / 'states.sqlite3'), ttl=ttl)
+    return make
+
+
+def test_compare_and_set_checks_version(make_store):
+    store = make_store()
+    store.set(1, {'state': 'learning', 'data': {'word_en': 'cat'}})
+    first = store.get(1)
+
+    assert store.compare_and_set(1, {'state': 'learning', 'data': {'word_en': 'dog'}}, first['version'])
+    # Второй обработчик прочитал то же состояние, но записал позже — запись отклоняется
+    assert not store.compare_and_set(1, {'state': 'learning', 'data': {'word_en': 'fox'}}, first['version'])
+
+    current = store.get(1)
+    assert current['data'] == {'word_en': 'dog'}
+    assert current['version'] == first['version'] + 1
+
+
+def test_compare_and_set_after_delete(make_store):
+    store = make_store()
+    version = store.set(1, {'state': 'learning', 'data': {}})
+    store.delete(1)
+
+    assert not store.compare_and_set(1, {'state': 'learning', 'data': {}}, version)
+    assert store.get(1) is None
+
+
+def test_set_increments_version(make_store):
+    store = make_store()
+
+    assert store.set(1, {'state': 'a', 'data': {}}) == 1
+    assert store.set(1, {'state': 'b', 'data': {}}) == 2
+    assert store.get(1)['state'] == 'b'
+
+
+def test_expired_state_is_gone(make_store):
+    store = make_store(ttl=SHORT_TTL)
+    version = store.set(1, {'state': 'learning', 'data': {}})
+    store.set(2, {'state': 'learning', 'data': {}})
+    time.sleep(SHORT_TTL * 2)
+
+    assert store.get(1) is None
+    assert not store.compare_and_set(1, {'state': 'learning', 'data': {}}, version)
+    assert store.size() == 0
+
+
+def test_sqlite_write_purges_expired(tmp_path, monkeypatch):
+    monkeypatch.setattr('bot.states.state_store.SQLITE_PURGE_INTERVAL', 0)
+    path = str(tmp_path / 'states.sqlite3')
+    store = SqliteStateStore(path, ttl=SHORT_TTL)
+    store.set(1, {'state': 'learning', 'data': {}})
+    time.sleep(SHORT_TTL * 2)
+
+    store.set(2, {'state': 'learning', 'data': {}})
+
+    rows = store._connect().execute('SELECT user_id FROM user_states').fetchall()
+    assert rows == [(2,)]
+
+
+def test_codec_round_trip_learning_session():
+    learning = LearningSession(
+        user_id=7,
+        translate_ids=array('i', [10, 20, 30]),
+        flags=array('b', [0, IN_FAVORITES, IS_USER_WORD]),
+        personal={30: ('own', 'свое', None)}
+    )
+    learning.index = 1
+    learning.correct_count = 1
+    learning.answered = True
+
+    state = decode_state(encode_state({'state': 'learning', 'data': {'word_en': 'cat', 'session': learning}}))
+    restored = state['data'].pop('session')
+
+    assert state == {'state': 'learning', 'data': {'word_en': 'cat'}}
+    assert list(restored.translate_ids) == [10, 20, 30]
+    assert list(restored.flags) == [0, IN_FAVORITES, IS_USER_WORD]
+    assert restored.personal == {30: ('own', 'свое', None)}
+    assert (restored.user_id, restored.index, restored.correct_count, restored.answered) == (7, 1, 1, True)
+
+
+def test_codec_round_trip_seeded_session():
+    learning = SeededSession(user_id=7, seed=123456789, version=3, count=20)
+    learning.cursor = 42
+    learning.index = 5
+    learning.correct_count = 4
+
+    restored = decode_state(encode_state({'state': 'learning', 'data': {'session': learning}}))['data']['session']
+
+    assert restored.to_bytes() == learning.to_bytes()
+    assert restored._keys == learning._keys
+
+
+def test_codec_round_trip_without_session():
+    state = {'state': 'adding_word', 'data': {'word_en': 'ёж'}}
+
+    assert decode_state(encode_state(state)) == state
@@ -0,0 +1,125 @@
+# Пул обработчиков бота с порядком по чатам (ChatOrderedPool).
+# БД PostgreSQL и Telegram не нужны: задачи — обычные функции, обновления — заглушки с chat.id.
+#     python -m pytest tests/test_worker_pool.py
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from bot.worker_pool import ChatOrderedPool
+
+# Сколько ждать событий в тестах, прежде чем считать, что они не наступят
+WAIT_TIMEOUT = 5
+
+
+def update(chat_id: int) -> SimpleNamespace:
+    """Обновление Telegram из чата chat_id (достаточно для chat_key)."""
+    return SimpleNamespace(chat=SimpleNamespace(id=chat_id))
+
+
+@pytest.fixture
+def make_pool():
+    """Фабрика пулов, которые закрываются после теста."""
+    pools = []
+
+    def make(num_threads: int, max_pending: int) -> ChatOrderedPool:
+        pool = ChatOrderedPool(SimpleNamespace(exception_handler=None), num_threads, max_pending)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+def test_tasks_of_chat_run_in_order(make_pool):
+    pool = make_pool(num_threads=4, max_pending=1000)
+    done = {chat_id: [] for chat_id in range(3)}
+    running = set()
+    overlaps = []
+    lock = threading.Lock()
+    finished = threading.Semaphore(0)
+
+    def task(message, number):
+        chat_id = message.chat.id
+        with lock:
+            if chat_id in running:
+                overlaps.append(chat_id)
+            running.add(chat_id)
+        time.sleep(0.001)
+        with lock:
+            running.discard(chat_id)
+            done[chat_id].append(number)
+        finished.release()
+
+    for number in range(30):
+        for chat_id in done:
+            assert pool.put(task, update(chat_id), number)
+    for _ in range(30 * len(done)):
+        assert finished.acquire(timeout=WAIT_TIMEOUT)
+
+    assert overlaps == []
+    assert all(numbers == list(range(30)) for numbers in done.values())
+
+
+def test_slow_chat_does_not_block_others(make_pool):
+    pool = make_pool(num_threads=2, max_pending=1000)
+    release = threading.Event()
+    fast_done = threading.Event()
+
+    pool.put(lambda message: release.wait(WAIT_TIMEOUT), update(1))
+    pool.put(lambda message: fast_done.set(), update(2))
+
+    assert fast_done.wait(WAIT_TIMEOUT)
+    release.set()
+
+
+def test_put_waits_when_queues_are_full(make_pool):
+    pool = make_pool(num_threads=1, max_pending=2)
+    release = threading.Event()
+    accepted = threading.Event()
+
+    pool.put(lambda message: release.wait(WAIT_TIMEOUT), update(1))
+    pool.put(lambda message: None, update(2))
+
+    def put_third():
+        pool.put(lambda message: None, update(3))
+        accepted.set()
+
+    threading.Thread(target=put_third, daemon=True).start()
+
+    # Обработчик занят, в очередях max_pending задач — третья задача не принимается
+    assert not accepted.wait(0.2)
+    assert pool.depth() == 2
+
+    release.set()
+    assert accepted.wait(WAIT_TIMEOUT)
+
+
+def test_put_after_close_is_rejected(make_pool):
+    pool = make_pool(num_threads=1, max_pending=10)
+    pool.close()
+
+    assert pool.put(lambda message: None, update(1)) is False
+
+
+def test_close_releases_waiting_put(make_pool):
+    pool = make_pool(num_threads=1, max_pending=1)
+    release = threading.Event()
+    results = []
+
+    pool.put(lambda message: release.wait(WAIT_TIMEOUT), update(1))
+    waiting = threading.Thread(target=lambda: results.append(pool.put(lambda message: None, update(2))))
+    waiting.start()
+    time.sleep(0.1)
+
+    # close() ждет обработчик, поэтому вызываем его в отдельном потоке и отпускаем задачу после проверки
+    closing = threading.Thread(target=pool.close)
+    closing.start()
+    waiting.join(WAIT_TIMEOUT)
+    release.set()
+    closing.join(WAIT_TIMEOUT)
+
+    assert results == [False]